@@ -1,28 +1,52 @@
-import pygame, sys, random, os, re
-from pygame.math import Vector2
+import time
+T_START = time.perf_counter()   # référence du temps jusqu'au premier affichage
+import pygame, sys, os, re, random
+from collections import OrderedDict
+from itertools import islice
 import db
+import engine
+from autopilot import Autopilot
+from recorder import RunRecorder
+from replay import ReplayWriter
+from settings import SettingsStore
+from profiler import FrameProfiler
 
 # --- DB ---
 db.init_db()
+run_recorder = RunRecorder()   # écritures de fin de partie en arrière-plan
+settings = SettingsStore()     # réglages en mémoire, écrits en différé
+
+# --- Profilage (SNAKE_PROFILE=1 ou F3) ---
+profiler = FrameProfiler.from_env()
 
 # --- Joueur courant ---
 current_player_id = None
 current_player_name = None
 
-pygame.init()
+# seuls les modules utilisés (pygame.init() ouvrirait aussi l'audio, jamais utilisé)
+pygame.display.init()
+pygame.font.init()
 
 # --- Couleurs ---
 GREEN = (173, 204, 96)
 DARK_GREEN = (43, 51, 24)
 WHITE = (255, 255, 255)
 LIGHT_ACTIVE_GREEN = (140, 190, 90)  # actif pour certains boutons
+CHECK_GREEN = (165, 197, 90)         # damier des grands plateaux (repère de défilement)
+ERROR_RED = (200, 40, 40)
 
 # --- Validation pseudo ---
 ALLOWED_USERNAME_RE = re.compile(r"^[A-Za-z0-9 _-]{3,20}$")
 
 # --- Grille ---
-number_of_cells = 25
+# Côté choisi au menu (persisté). Quand le plateau ne tient plus à l'écran avec
+# des cases lisibles, une caméra suit la tête et n'affiche qu'une partie du plateau.
+GRID_SIZES = (25, 50, 100, 250, 500)
+number_of_cells = int(settings.get_choice("grid_size", [str(n) for n in GRID_SIZES], "25"))
+grid_choice = number_of_cells   # grille de la prochaine partie (number_of_cells = partie en cours)
 GRID_SCALE = 0.86   # la grille prend ~86% du côté court -> marge pour HUD
+MIN_CELL_SIZE = 12      # en dessous : vue caméra
+CAMERA_CELL_SIZE = 24
 
 # --- Fenêtre initiale ---
 BASE_SIDE = 900
@@ -32,16 +56,22 @@ clock = pygame.time.Clock()
 screen_rect = screen.get_rect()
 
 # --- Images ---
+# Chargées au premier usage : seuls le logo et la bordure servent au menu,
+# la pomme attend le début de la première partie.
 base_path = os.path.dirname(__file__)
-apple_path = os.path.join(base_path, "images", "apple.png")
-apple_raw = pygame.image.load(apple_path).convert_alpha()
-apple_raw.set_colorkey(apple_raw.get_at((0, 0)))
+_images = {}
 
-logo_path = os.path.join(base_path, "images", "snake.png")
-logo_raw = pygame.image.load(logo_path).convert_alpha() if os.path.exists(logo_path) else None
+def load_image(name, colorkey=False):
+    if name not in _images:
+        path = os.path.join(base_path, "images", name)
+        img = pygame.image.load(path).convert_alpha() if os.path.exists(path) else None
+        if img is not None and colorkey:
+            img.set_colorkey(img.get_at((0, 0)))
+        _images[name] = img
+    return _images[name]
 
-border_path = os.path.join(base_path, "images", "border.png")
-border_raw = pygame.image.load(border_path).convert_alpha() if os.path.exists(border_path) else None
+logo_raw = load_image("snake.png")
+border_raw = load_image("border.png")
 
 # Décor
 BORDER_INSET_SRC = 128
@@ -66,85 +96,149 @@ offset_x = (screen_rect.w - board_size) // 2
 offset_y = (screen_rect.h - board_size) // 2
 
 # --- Surfaces dépendantes ---
-food_surface = None
+food_surface = None     # pomme à l'échelle, créée au premier draw_food
 logo_surface = None
+segment_surface = None   # segment arrondi pré-rendu, blitté en lot pour tout le corps
+cell_positions = []      # coin haut-gauche en pixels de chaque case (index y * cells + x), hors caméra
 
 def rescale_assets():
-    global food_surface, logo_surface
-    food_surface = pygame.transform.smoothscale(apple_raw, (cell_size, cell_size))
+    global food_surface, logo_surface, segment_surface
+    food_surface = None
+    segment_surface = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+    pygame.draw.rect(segment_surface, DARK_GREEN, (0, 0, cell_size, cell_size), 0, 6)
     if logo_raw:
         side = int(clamp(cell_size * 4.2, 70, 200))
         logo_surface = pygame.transform.smoothscale(logo_raw, (side, side))
     else:
         logo_surface = None
 
-def compute_layout_for_window(w, h):
-    global cell_size, board_size, offset_x, offset_y, title_font, score_font, ui_font
+def layout_board(w, h):
+    """Taille des cases et position du plateau (ou de la vue caméra) à l'écran."""
+    global cell_size, board_size, offset_x, offset_y, cell_positions
     usable_side = int(min(w, h) * GRID_SCALE)
-    cell_size = max(12, usable_side // number_of_cells)
-    board_size = cell_size * number_of_cells
+    if usable_side // number_of_cells >= MIN_CELL_SIZE:
+        cell_size = usable_side // number_of_cells
+        view_cells = number_of_cells
+    else:
+        cell_size = CAMERA_CELL_SIZE
+        view_cells = max(1, usable_side // cell_size)
+    board_size = cell_size * view_cells
     offset_x = (w - board_size) // 2
     offset_y = (h - board_size) // 2
-    scale_ui = min(w / BASE_SIDE, h / BASE_SIDE)
-    title_font, score_font, ui_font = make_fonts(scale_ui)
+    camera.configure(view_cells < number_of_cells, view_cells)
+    # positions précalculées seulement quand tout le plateau est affiché
+    cell_positions = [] if camera.enabled else [
+        (offset_x + x * cell_size, offset_y + y * cell_size)
+        for y in range(number_of_cells) for x in range(number_of_cells)]
     rescale_assets()
+    invalidate_background()
 
-def screen_fit_rect():
-    return pygame.Rect(0, 0, screen_rect.w, screen_rect.h)
-
-def draw_border_at_rect(rect):
-    if not border_raw or rect is None:
-        return
-    scaled = pygame.transform.smoothscale(border_raw, (rect.w, rect.h))
-    screen.blit(scaled, rect.topleft)
-
-def draw_fullscreen_border_with_board_hole():
-    if not border_raw:
-        return
-    draw_border_at_rect(screen_fit_rect())
-    pygame.draw.rect(screen, GREEN, (offset_x, offset_y, board_size, board_size))
+def compute_layout_for_window(w, h):
+    global title_font, score_font, ui_font
+    layout_board(w, h)
+    scale_ui = min(w / BASE_SIDE, h / BASE_SIDE)
+    title_font, score_font, ui_font = make_fonts(scale_ui)
+    text_cache.clear()
+
+# --- Fond mis en cache ---
+# Bordure jungle mise à l'échelle + trou du plateau + cadre, composés une seule
+# fois par taille de fenêtre et par état : chaque frame ne fait plus qu'un blit.
+BACKGROUND_KINDS = {
+    "MENU": "PLAIN", "LEADERBOARD": "PLAIN", "HELP_MENU": "PLAIN",
+    "PLAYING": "BOARD",   # bordure évidée sous le plateau + cadre
+    "DEMO": "BOARD",
+    "PAUSED": "FRAME",    # bordure pleine + cadre (le plateau est masqué)
+}
+_background_cache = {}
+
+def invalidate_background():
+    _background_cache.clear()
+
+def _scaled_border():
+    key = ("BORDER", screen_rect.size)
+    if key not in _background_cache:
+        _background_cache[key] = pygame.transform.smoothscale(border_raw, screen_rect.size) if border_raw else None
+    return _background_cache[key]
+
+def get_background(state):
+    kind = BACKGROUND_KINDS.get(state, "PLAIN")
+    key = (kind, screen_rect.size)
+    bg = _background_cache.get(key)
+    if bg is None:
+        bg = pygame.Surface(screen_rect.size).convert()
+        bg.fill(GREEN)
+        border = _scaled_border()
+        if border:
+            bg.blit(border, (0, 0))
+        if kind == "BOARD" and border:
+            pygame.draw.rect(bg, GREEN, (offset_x, offset_y, board_size, board_size))
+        if kind in ("BOARD", "FRAME"):
+            pygame.draw.rect(bg, DARK_GREEN,
+                             (offset_x - 5, offset_y - 5, board_size + 10, board_size + 10), 5)
+        _background_cache[key] = bg
+    return bg
 
 # --- Texte avec contour ---
-def blit_text_with_outline_topleft(surface, text, font, main_color, outline_color, x, y, thickness=2):
+# Le texte contouré (1 rendu + 8 blits de contour) est composé une seule fois
+# dans une surface mise en cache LRU ; chaque frame ne fait plus qu'un blit.
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    def get(self, text, font, main_color, outline_color, thickness):
+        key = (text, font, main_color, outline_color, thickness)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = render_text_with_outline(text, font, main_color, outline_color, thickness)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surf
+    def clear(self):
+        # les polices sont recréées au redimensionnement : les anciennes entrées ne resserviront plus
+        self.entries.clear()
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+def render_text_with_outline(text, font, main_color, outline_color, thickness=2):
     base = font.render(text, True, main_color)
     outline = font.render(text, True, outline_color)
-    for dx in (-thickness, 0, thickness):
-        for dy in (-thickness, 0, thickness):
-            if dx == 0 and dy == 0: continue
-            surface.blit(outline, (x + dx, y + dy))
-    surface.blit(base, (x, y))
+    w, h = base.get_size()
+    surf = pygame.Surface((w + 2 * thickness, h + 2 * thickness), pygame.SRCALPHA)
+    for dx in (0, thickness, 2 * thickness):
+        for dy in (0, thickness, 2 * thickness):
+            if dx == thickness and dy == thickness: continue
+            surf.blit(outline, (dx, dy))
+    surf.blit(base, (thickness, thickness))
+    return surf
+
+text_cache = TextCache()
+
+def blit_text_with_outline_topleft(surface, text, font, main_color, outline_color, x, y, thickness=2):
+    surf = text_cache.get(text, font, main_color, outline_color, thickness)
+    return surface.blit(surf, (x - thickness, y - thickness))
 
 def blit_text_with_outline_topright(surface, text, font, main_color, outline_color, x, y, thickness=2):
-    base = font.render(text, True, main_color)
-    outline = font.render(text, True, outline_color)
-    base_rect = base.get_rect(topright=(x, y))
-    for dx in (-thickness, 0, thickness):
-        for dy in (-thickness, 0, thickness):
-            if dx == 0 and dy == 0: continue
-            r = outline.get_rect(topright=(x + dx, y + dy))
-            surface.blit(outline, r.topleft)
-    surface.blit(base, base_rect.topleft)
+    surf = text_cache.get(text, font, main_color, outline_color, thickness)
+    return surface.blit(surf, surf.get_rect(topright=(x + thickness, y - thickness)))
 
 def blit_text_with_outline_center(surface, text, font, main_color, outline_color, center, thickness=2):
-    base = font.render(text, True, main_color)
-    outline = font.render(text, True, outline_color)
-    rect = base.get_rect(center=center)
-    for dx in (-thickness, 0, thickness):
-        for dy in (-thickness, 0, thickness):
-            if dx == 0 and dy == 0: continue
-            r = outline.get_rect(center=(center[0] + dx, center[1] + dy))
-            surface.blit(outline, r)
-    surface.blit(base, rect)
+    surf = text_cache.get(text, font, main_color, outline_color, thickness)
+    return surface.blit(surf, surf.get_rect(center=center))
 
 # --- Paramètres Gameplay (persistés) ---
-SPEED_INTERVALS = {"facile": 220, "normal": 180, "difficile": 140}
-current_speed = db.get_setting("speed", "normal")
-if current_speed not in SPEED_INTERVALS:
-    current_speed = "normal"
-wrap_walls = db.get_setting("wrap_walls", "0") == "1"
+SPEED_INTERVALS = engine.SPEED_INTERVALS
+current_speed = settings.get_choice("speed", SPEED_INTERVALS, "normal")
+wrap_walls = settings.get_bool("wrap_walls", False)
 
 # --- États ---
-# MENU | PLAYING | LEADERBOARD | PAUSED | HELP_MENU
+# MENU | PLAYING | LEADERBOARD | PAUSED | HELP_MENU | DEMO
 app_state = "MENU"
 _prev_app_state = None  # pour l’anim du menu (si tu l’utilises encore)
 
@@ -230,10 +324,18 @@ class TextInput:
                         self.text += event.unicode
         return None
     def update(self, dt):
+        """Fait clignoter le curseur; renvoie True si son affichage a changé."""
         self.cursor_timer += dt
         if self.cursor_timer > 500:
             self.cursor_visible = not self.cursor_visible
             self.cursor_timer = 0
+            return self.blinking()
+        return False
+    def blinking(self):
+        # le curseur n'est dessiné que si le champ est actif et non vide
+        return self.active and bool(self.text)
+    def ms_to_next_blink(self):
+        return max(1, 501 - self.cursor_timer)
     def draw(self, surface):
         pygame.draw.rect(surface, self.bg_color, self.rect, border_radius=self.radius)
         pygame.draw.rect(surface, self.border_color, self.rect, width=2, border_radius=self.radius)
@@ -247,97 +349,67 @@ class TextInput:
 # =========================
 #         Jeu
 # =========================
-class Food:
-    def __init__(self, snake_body):
-        self.position = self.generate_random_position(snake_body)
-    def draw(self):
-        x = int(self.position.x * cell_size + offset_x)
-        y = int(self.position.y * cell_size + offset_y)
-        screen.blit(food_surface, (x, y))
-    def generate_random_cell(self):
-        return Vector2(random.randint(0, number_of_cells - 1),
-                       random.randint(0, number_of_cells - 1))
-    def generate_random_position(self, snake_body):
-        p = self.generate_random_cell()
-        while p in snake_body:
-            p = self.generate_random_cell()
-        return p
-
-class Snake:
-    def __init__(self):
-        self.body = [Vector2(6, 9), Vector2(5, 9), Vector2(4, 9)]
-        self.direction = Vector2(1, 0)
-        self.new_block = False
-    def draw(self):
-        for segment in self.body:
-            rect = (offset_x + segment.x * cell_size,
-                    offset_y + segment.y * cell_size,
-                    cell_size, cell_size)
-            pygame.draw.rect(screen, DARK_GREEN, rect, 0, 6)
-    def update(self):
-        self.body.insert(0, self.body[0] + self.direction)
-        if not self.new_block:
-            self.body = self.body[:-1]
-        else:
-            self.new_block = False
-    def reset(self):
-        self.body = [Vector2(6, 9), Vector2(5, 9), Vector2(4, 9)]
-        self.direction = Vector2(1, 0)
-
-class Game:
-    def __init__(self):
-        self.snake = Snake()
-        self.food = Food(self.snake.body)
-        self.state = "STOPPED"
-        self.score = 0
-    def draw(self):
-        self.snake.draw()
-        self.food.draw()
-    def update(self):
-        if self.state == "PLAYING":
-            self.snake.update()
-            self.apply_wrap_or_check_wall()
-            self.check_collision_with_food()
-            self.check_self_collision()
-    def apply_wrap_or_check_wall(self):
-        head = self.snake.body[0]
-        if wrap_walls:
-            if head.x < 0: head.x = number_of_cells - 1
-            elif head.x >= number_of_cells: head.x = 0
-            if head.y < 0: head.y = number_of_cells - 1
-            elif head.y >= number_of_cells: head.y = 0
-            self.snake.body[0] = head
-        else:
-            if head.x in (-1, number_of_cells) or head.y in (-1, number_of_cells):
-                self.game_over()
-    def check_collision_with_food(self):
-        if self.snake.body[0] == self.food.position:
-            self.food.position = self.food.generate_random_position(self.snake.body)
-            self.snake.new_block = True
-            self.score += 1
-    def check_self_collision(self):
-        if self.snake.body[0] in self.snake.body[1:]:
-            self.game_over()
-    def game_over(self):
-        global app_state
-        # Enregistrer le run avec meta (niveau + bords) si db.py le supporte
-        try:
-            db.record_run(self.score, current_player_id,
-                          speed_mode=current_speed, wrap_walls=1 if wrap_walls else 0)
-        except TypeError:
-            # rétrocompatibilité avec ancienne signature
-            try:
-                db.record_run(self.score, current_player_id)
-            except Exception as e:
-                print("DB error:", e)
-        except Exception as e:
-            print("DB error:", e)
-
-        self.snake.reset()
-        self.food.position = self.food.generate_random_position(self.snake.body)
-        self.state = "STOPPED"
-        self.score = 0
-        app_state = "MENU"
+# Rendu seulement : la logique (Snake/Food/Game) vit dans engine.py
+def cell_rect(cell, cells):
+    y, x = divmod(cell, cells)
+    return pygame.Rect(offset_x + x * cell_size, offset_y + y * cell_size, cell_size, cell_size)
+
+def draw_segment(rect):
+    screen.blit(segment_surface, rect)
+
+# fblits (pygame-ce) évite de construire la liste de rects de retour ; sinon blits(doreturn=0)
+def _blit_batch(surface, pairs):
+    fblits = getattr(surface, "fblits", None)
+    if fblits:
+        fblits(pairs)
+    else:
+        surface.blits(pairs, doreturn=0)
+
+def draw_snake(snake):
+    seg = segment_surface
+    pos = cell_positions
+    if motion.active():
+        # tête (et queue) interpolées entre deux ticks
+        pairs = [(seg, pos[cell]) for cell in islice(snake.body, 1, None)]
+        pairs.extend(motion.sprites(snake))
+    else:
+        pairs = [(seg, pos[cell]) for cell in snake.body]
+    _blit_batch(screen, pairs)
+
+def get_food_surface():
+    global food_surface
+    if food_surface is None:
+        food_surface = pygame.transform.smoothscale(load_image("apple.png", colorkey=True), (cell_size, cell_size))
+    return food_surface
+
+def cell_pos(cell):
+    return camera.pos(cell) if camera.enabled else cell_positions[cell]
+
+def draw_food(food):
+    screen.blit(get_food_surface(), cell_pos(food.position))
+
+def draw_game(game):
+    draw_snake(game.snake)
+    draw_food(game.food)
+
+def game_over(won=False):
+    global app_state
+    # Enregistrer le run avec meta (niveau + bords) et son replay, sans bloquer la boucle
+    interval = SPEED_INTERVALS.get(replay_writer.speed_mode, SPEED_INTERVALS["normal"])
+    run_recorder.record(game.score, current_player_id,
+                        duration_seconds=round(game.ticks * interval / 1000), steps=game.ticks,
+                        speed_mode=replay_writer.speed_mode,
+                        wrap_walls=1 if replay_writer.wrap_walls else 0,
+                        replay=replay_writer.finish(game.ticks, game.score),
+                        grid_size=game.cells)
+
+    if won:   # plateau rempli : annoncé sur le menu
+        menu_screen.message = f"Gagné ! Plateau rempli, score {game.score}."
+        menu_screen.message_color = DARK_GREEN
+    game.reset()
+    motion.reset()
+    sim_clock.reset()
+    app_state = "MENU"
 
 # =========================
 #        Écrans
@@ -357,8 +429,10 @@ class MenuScreen:
         self.speed_normal = Button(pygame.Rect(0,0,10,10),  "Normal",     ui_font, DARK_GREEN, (255,255,255), (60,72,35))
         self.speed_hard   = Button(pygame.Rect(0,0,10,10),  "Difficile",  ui_font, DARK_GREEN, (255,255,255), (60,72,35))
         self.wrap_toggle  = Toggle(pygame.Rect(0,0,10,10), ui_font, "Bords traversables", on=wrap_walls)
+        self.grid_btn     = Button(pygame.Rect(0,0,10,10), f"{grid_choice}x{grid_choice}", ui_font, DARK_GREEN, (255,255,255), (60,72,35))
 
         self.message = ""
+        self.message_color = ERROR_RED
         self.relayout(screen_rect)
 
         # petite anim d’accueil
@@ -398,8 +472,10 @@ class MenuScreen:
         self.speed_hard.set_rect(  pygame.Rect(start_x + 2*(btn_w + spacing), speed_y, btn_w, btn_h))
 
         toggle_h = btn_h
-        toggle_w = int(clamp(w * 0.50, 360, 640))
-        self.wrap_toggle.set_rect(pygame.Rect(r.centerx - toggle_w//2, toggle_y, toggle_w, toggle_h))
+        toggle_w = int(clamp(w * 0.40, 300, 520))
+        row_x = r.centerx - (toggle_w + spacing + btn_w) // 2
+        self.wrap_toggle.set_rect(pygame.Rect(row_x, toggle_y, toggle_w, toggle_h))
+        self.grid_btn.set_rect(pygame.Rect(row_x + toggle_w + spacing, toggle_y, btn_w, btn_h))
 
         main_btn_w = int(clamp(w * 0.30, 240, 380))
         main_btn_h = btn_h
@@ -416,16 +492,22 @@ class MenuScreen:
         self.ui_font = ui_font
         self.input.set_font(ui_font)
         for b in (self.start_btn, self.leader_btn, self.help_btn,
-                  self.speed_easy, self.speed_normal, self.speed_hard):
+                  self.speed_easy, self.speed_normal, self.speed_hard, self.grid_btn):
             b.set_font(ui_font)
         self.wrap_toggle.set_font(ui_font)
 
     def _apply_speed_choice(self, choice: str):
         global current_speed
         if choice not in SPEED_INTERVALS: return
-        current_speed = choice
-        db.set_setting("speed", choice)
-        set_snake_timer(SPEED_INTERVALS[choice])
+        current_speed = choice   # pour la prochaine partie (start_game), pas celle en pause
+        settings.set("speed", choice)
+
+    def _cycle_grid(self):
+        global grid_choice
+        i = GRID_SIZES.index(grid_choice) if grid_choice in GRID_SIZES else -1
+        grid_choice = GRID_SIZES[(i + 1) % len(GRID_SIZES)]
+        self.grid_btn.text = f"{grid_choice}x{grid_choice}"
+        settings.set("grid_size", grid_choice)   # appliqué à la prochaine partie (start_game)
 
     def handle_event(self, event):
         s = self.input.handle_event(event)
@@ -438,16 +520,25 @@ class MenuScreen:
 
         if self.wrap_toggle.is_clicked(event):
             global wrap_walls
-            wrap_walls = self.wrap_toggle.on
-            db.set_setting("wrap_walls", "1" if wrap_walls else "0")
+            wrap_walls = self.wrap_toggle.on   # appliqué à la prochaine partie (start_game)
+            settings.set_bool("wrap_walls", wrap_walls)
+        if self.grid_btn.is_clicked(event):
+            self._cycle_grid()
 
         if self.start_btn.is_clicked(event):   return ("START", self.input.text.strip() or None)
         if self.leader_btn.is_clicked(event):  return ("LEADERBOARD", None)
         if self.help_btn.is_clicked(event):    return ("HELP_MENU", None)
         return (None, None)
 
-    def update(self, dt): 
-        self.input.update(dt)
+    def update(self, dt):
+        return self.input.update(dt)
+
+    def animating(self):
+        return self._anim_t() < 1.0
+
+    def buttons(self):
+        return (self.start_btn, self.leader_btn, self.help_btn,
+                self.speed_easy, self.speed_normal, self.speed_hard, self.grid_btn)
 
     def draw(self, surface):
         t = self._anim_t()
@@ -483,13 +574,14 @@ class MenuScreen:
             btn.draw(surface, override_bg=color)
 
         self.wrap_toggle.draw(surface)
+        self.grid_btn.draw(surface)
         self.input.draw(surface)
         self.start_btn.draw(surface)
         self.leader_btn.draw(surface)
         self.help_btn.draw(surface)
 
         if self.message:
-            m = self.ui_font.render(self.message, True, (200, 40, 40))
+            m = self.ui_font.render(self.message, True, self.message_color)
             surface.blit(m, m.get_rect(midtop=(self.screen_rect.centerx, self.input.rect.bottom + 10)))
 
 # -------- Leaderboard avec filtres niveau + bords --------
@@ -502,6 +594,7 @@ class LeaderboardScreen:
         self.current_period = "daily"  # jour/weekly/monthly
         self.filter_speed = "all"      # all/facile/normal/difficile
         self.filter_wrap  = "all"      # all/on/off
+        self.grid_size = grid_choice   # un classement par taille de plateau (celle du menu)
 
         # Période
         self.daily_btn   = Button(pygame.Rect(0,0,10,10), "Jour",     ui_font, DARK_GREEN, (255,255,255), (60,72,35))
@@ -581,6 +674,11 @@ class LeaderboardScreen:
                   self.wrap_all_btn, self.wrap_on_btn, self.wrap_off_btn, self.back_btn):
             b.set_font(ui_font)
 
+    def buttons(self):
+        return (self.daily_btn, self.weekly_btn, self.monthly_btn,
+                self.speed_all_btn, self.speed_easy_btn, self.speed_norm_btn, self.speed_hard_btn,
+                self.wrap_all_btn, self.wrap_on_btn, self.wrap_off_btn, self.back_btn)
+
     def _active_col(self, is_active):
         return LIGHT_ACTIVE_GREEN if is_active else DARK_GREEN
 
@@ -613,18 +711,21 @@ class LeaderboardScreen:
     def load_rows(self):
         wrap_bool = self._wrap_to_bool()
         speed_mode = None if self.filter_speed == "all" else self.filter_speed
+        self.grid_size = grid_choice
+        run_recorder.flush()   # inclure la partie qui vient de se terminer
         try:
-            self.rows = db.leaderboard(self.current_period, 10, speed_mode=speed_mode, wrap_walls=wrap_bool)
+            self.rows = db.cached_leaderboard(self.current_period, 10, speed_mode=speed_mode, wrap_walls=wrap_bool,
+                                              grid_size=self.grid_size)
         except Exception:
             try:
-                self.rows = db.leaderboard(self.current_period, 10)
+                self.rows = db.cached_leaderboard(self.current_period, 10, grid_size=self.grid_size)
             except Exception:
                 self.rows = []
 
     def draw(self, surface):
         # Titre
         blit_text_with_outline_center(
-            surface, "Classements", self.title_font, DARK_GREEN, WHITE,
+            surface, f"Classements {self.grid_size}x{self.grid_size}", self.title_font, DARK_GREEN, WHITE,
             (self.screen_rect.centerx, int(self.screen_rect.height * 0.08)), thickness=3
         )
 
@@ -713,6 +814,8 @@ class PauseScreen:
         self.ui_font = ui_font
         self.resume_btn.set_font(ui_font)
         self.menu_btn.set_font(ui_font)
+    def buttons(self):
+        return (self.resume_btn, self.menu_btn)
     def handle_event(self, event, show_resume: bool):
         if show_resume and self.resume_btn.is_clicked(event):
             return "RESUME"
@@ -754,157 +857,626 @@ def layout_hud_help():
     y = max(margin, int(offset_y * 0.25))
     hud_help_btn.set_rect(pygame.Rect(x, y, btn_w, btn_h))
 
+def draw_hud(surface, with_help_btn=True):
+    """Titre + score (+ bouton aide); renvoie les rects dessinés."""
+    hud_y = max(10, int(offset_y * 0.6))
+    rects = [
+        blit_text_with_outline_topleft(
+            surface, "Snake Game", title_font, DARK_GREEN, WHITE,
+            offset_x - 5, hud_y, thickness=3
+        ),
+        blit_text_with_outline_topright(
+            surface, str(game.score), score_font, DARK_GREEN, WHITE,
+            screen_rect.w - offset_x, hud_y, thickness=3
+        ),
+    ]
+    if with_help_btn and app_state != "DEMO":
+        hud_help_btn.draw(surface)
+        rects.append(hud_help_btn.rect.copy())
+    return rects
+
+# =========================
+#   Rendu par zones sales
+# =========================
+# En PLAYING (et en démo), seules les cases touchées par un tick (queue libérée,
+# nouvelle tête, ancienne/nouvelle pomme) et le HUD (score, survol du bouton) sont
+# redessinées puis passées à display.update(rects). Redimensionnement, changement
+# d'état et overlays repassent par un rendu complet.
+DIRTY_RECTS = True
+
+class DirtyTracker:
+    def __init__(self):
+        self.full = True
+        self.state = None        # état dessiné à la dernière frame
+        self.cells = set()
+        self.motion_cells = set()
+        self.hud_area = None     # union des zones HUD de la dernière frame
+        self.score = None
+        self.hover = None
+    def mark_full(self):
+        self.full = True
+        self.cells.clear()
+        self.motion_cells = set()
+    def note_step(self, game, old_tail, old_food):
+        self.cells.add(game.snake.head)
+        self.cells.add(old_tail)
+        for cell in (old_food, game.food.position):
+            if cell >= 0:
+                self.cells.add(cell)
+
+dirty = DirtyTracker()
+
+# --- Interpolation entre deux ticks ---
+# Seules la tête et la queue bougent d'un tick à l'autre : on les dessine à
+# mi-chemin entre leur case précédente et leur case actuelle (alpha = avance de
+# l'accumulateur), le reste du corps reste sur sa case.
+INTERPOLATE = True
+
+def _lerp_pos(cell_from, cell_to, t):
+    x0, y0 = cell_pos(cell_from)
+    x1, y1 = cell_pos(cell_to)
+    if abs(x1 - x0) > cell_size or abs(y1 - y0) > cell_size:
+        return (x1, y1)   # passage d'un bord à l'autre (wrap) : pas d'interpolation
+    return (round(x0 + (x1 - x0) * t), round(y0 + (y1 - y0) * t))
+
+class SnakeMotion:
+    def __init__(self):
+        self.reset()
+    def reset(self):
+        self.head_from = None
+        self.tail_from = None   # case libérée par la queue au dernier tick (None si le serpent a grandi)
+        self.alpha = 1.0
+    def note_step(self, game, old_head, old_tail):
+        self.head_from = old_head
+        self.tail_from = old_tail if game.snake.body[-1] != old_tail else None
+    def active(self):
+        return self.head_from is not None and self.alpha < 1.0
+    def sprites(self, snake):
+        out = [(segment_surface, _lerp_pos(self.head_from, snake.head, self.alpha))]
+        if self.tail_from is not None:
+            out.append((segment_surface, _lerp_pos(self.tail_from, snake.body[-1], self.alpha)))
+        return out
+    def cells(self, snake):
+        cells = {self.head_from, snake.head, snake.body[-1]}
+        if self.tail_from is not None:
+            cells.add(self.tail_from)
+        return cells
+
+motion = SnakeMotion()
+
+# --- Grands plateaux : caméra ---
+# La vue (board_size x board_size à l'écran) suit la tête. Le terrain est
+# découpé en blocs de CHUNK_CELLS cases rendus une fois et gardés en cache LRU ;
+# seuls les blocs, segments et pomme visibles sont dessinés, les segments étant
+# trouvés en parcourant le bitmap d'occupation des lignes visibles.
+CHUNK_CELLS = 16
+CHUNK_CACHE_SIZE = 32
+
+class Camera:
+    def __init__(self):
+        self.enabled = False
+        self.view_cells = 0
+        self.x = self.y = 0           # coin haut-gauche de la vue, en pixels du plateau
+        self.chunks = OrderedDict()   # (cx, cy) -> surface du terrain
+    def configure(self, enabled, view_cells):
+        self.enabled = enabled
+        self.view_cells = view_cells
+        self.chunks.clear()
+    def follow(self, snake, alpha):
+        """Centre la vue sur la tête (interpolée), sans sortir du plateau."""
+        n = number_of_cells
+        hy, hx = divmod(snake.head, n)
+        if motion.active():
+            fy, fx = divmod(motion.head_from, n)
+            if abs(hx - fx) + abs(hy - fy) == 1:   # pas de lissage sur un passage de bord
+                hx = fx + (hx - fx) * alpha
+                hy = fy + (hy - fy) * alpha
+        limit = (n - self.view_cells) * cell_size
+        self.x = int(clamp((hx + 0.5) * cell_size - board_size / 2, 0, limit))
+        self.y = int(clamp((hy + 0.5) * cell_size - board_size / 2, 0, limit))
+    def pos(self, cell):
+        y, x = divmod(cell, number_of_cells)
+        return (offset_x + x * cell_size - self.x, offset_y + y * cell_size - self.y)
+    def visible(self):
+        """Cases (x0, x1, y0, y1) au moins en partie dans la vue, bornes incluses."""
+        last = number_of_cells - 1
+        return (self.x // cell_size, min(last, (self.x + board_size - 1) // cell_size),
+                self.y // cell_size, min(last, (self.y + board_size - 1) // cell_size))
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        surf = self.chunks.get(key)
+        if surf is not None:
+            self.chunks.move_to_end(key)
+            return surf
+        cols = min(CHUNK_CELLS, number_of_cells - cx * CHUNK_CELLS)
+        rows = min(CHUNK_CELLS, number_of_cells - cy * CHUNK_CELLS)
+        surf = pygame.Surface((cols * cell_size, rows * cell_size)).convert()
+        surf.fill(GREEN)
+        for y in range(rows):
+            for x in range((y + cx * CHUNK_CELLS + cy * CHUNK_CELLS + 1) % 2, cols, 2):
+                surf.fill(CHECK_GREEN, (x * cell_size, y * cell_size, cell_size, cell_size))
+        self.chunks[key] = surf
+        if len(self.chunks) > CHUNK_CACHE_SIZE:
+            self.chunks.popitem(last=False)
+        return surf
+    def draw(self, surface, game):
+        """Dessine la partie visible du plateau; renvoie le rect de la vue."""
+        view = pygame.Rect(offset_x, offset_y, board_size, board_size)
+        clip = surface.get_clip()
+        surface.set_clip(view)
+        x0, x1, y0, y1 = self.visible()
+        span = CHUNK_CELLS * cell_size
+        _blit_batch(surface, [(self.chunk(cx, cy), (offset_x + cx * span - self.x, offset_y + cy * span - self.y))
+                              for cy in range(y0 // CHUNK_CELLS, y1 // CHUNK_CELLS + 1)
+                              for cx in range(x0 // CHUNK_CELLS, x1 // CHUNK_CELLS + 1)])
+        snake = game.snake
+        moving = motion.active()
+        skip = snake.head if moving else -1
+        occupied, n, seg, pos = snake.occupied, number_of_cells, segment_surface, self.pos
+        pairs = []
+        for y in range(y0, y1 + 1):
+            end = y * n + x1 + 1
+            i = occupied.find(1, y * n + x0, end)
+            while i >= 0:
+                if i != skip:
+                    pairs.append((seg, pos(i)))
+                i = occupied.find(1, i + 1, end)
+        if moving:
+            pairs.extend(motion.sprites(snake))
+        _blit_batch(surface, pairs)
+        food = game.food.position
+        if food >= 0 and x0 <= food % n <= x1 and y0 <= food // n <= y1:
+            surface.blit(get_food_surface(), pos(food))
+        surface.set_clip(clip)
+        return view
+
+camera = Camera()
+
+def cells_in_rect(area, cells):
+    x0 = clamp((area.left - offset_x) // cell_size, 0, cells - 1)
+    x1 = clamp((area.right - 1 - offset_x) // cell_size, 0, cells - 1)
+    y0 = clamp((area.top - offset_y) // cell_size, 0, cells - 1)
+    y1 = clamp((area.bottom - 1 - offset_y) // cell_size, 0, cells - 1)
+    for y in range(y0, y1 + 1):
+        for x in range(x0, x1 + 1):
+            yield y * cells + x
+
+def redraw_area(area, bg):
+    """Remet le fond sous `area` puis les segments / la pomme qui la recouvrent."""
+    screen.blit(bg, area, area)
+    board = pygame.Rect(offset_x, offset_y, board_size, board_size)
+    if not area.colliderect(board):
+        return
+    snake = game.snake
+    moving = motion.active()
+    skip = snake.head if moving else -1
+    clip = screen.get_clip()
+    screen.set_clip(area)
+    for cell in cells_in_rect(area.clip(board), game.cells):
+        if snake.occupied[cell] and cell != skip:
+            draw_segment(cell_rect(cell, game.cells))
+        if cell == game.food.position:
+            draw_food(game.food)
+    if moving:
+        _blit_batch(screen, motion.sprites(snake))
+    screen.set_clip(clip)
+
+def draw_camera_dirty(bg):
+    # la vue défile à chaque frame : fond sous le HUD, vue entière puis HUD
+    # (qui peut la chevaucher), dans le même ordre qu'un rendu complet
+    dirty.cells.clear()
+    screen.blit(bg, dirty.hud_area, dirty.hud_area)
+    camera.follow(game.snake, motion.alpha)
+    view = camera.draw(screen, game)
+    drawn = draw_hud(screen)
+    rects = [view, dirty.hud_area.unionall(drawn)]
+    dirty.hud_area = drawn[0].unionall(drawn[1:])
+    dirty.score = game.score
+    dirty.hover = hud_help_btn.rect.collidepoint(pygame.mouse.get_pos())
+    return rects
+
+def draw_playing_dirty():
+    bg = get_background("PLAYING")
+    if camera.enabled:
+        return draw_camera_dirty(bg)
+    # tête/queue interpolées : leurs cases (et celles de la frame précédente) bougent à chaque frame
+    moving = motion.cells(game.snake) if motion.active() else set()
+    dirty.cells |= moving | dirty.motion_cells
+    dirty.motion_cells = moving
+    rects = [cell_rect(cell, game.cells) for cell in dirty.cells]
+    dirty.cells.clear()
+    for r in rects:
+        redraw_area(r, bg)
+
+    hover = hud_help_btn.rect.collidepoint(pygame.mouse.get_pos())
+    hud_hit = dirty.hud_area is not None and dirty.hud_area.collidelist(rects) >= 0
+    if hud_hit or game.score != dirty.score or hover != dirty.hover:
+        redraw_area(dirty.hud_area, bg)
+        drawn = draw_hud(screen)
+        area = dirty.hud_area.unionall(drawn)
+        rects.append(area)
+        dirty.hud_area = drawn[0].unionall(drawn[1:])
+        dirty.score, dirty.hover = game.score, hover
+    return rects
+
 # =========================
 #   Instanciation & Layout
 # =========================
 compute_layout_for_window(screen_rect.w, screen_rect.h)
 rescale_assets()
-game = Game()
+game = engine.Game(number_of_cells, wrap_walls)
+replay_writer = ReplayWriter()
+game.on_turn = replay_writer.on_turn
 menu_screen = MenuScreen(screen_rect, title_font, ui_font)
-leader_screen = LeaderboardScreen(screen_rect, title_font, ui_font)
-pause_screen = PauseScreen(screen_rect, title_font, ui_font)
+leader_screen = None   # construits par build_screens, après le premier affichage
+pause_screen = None
+
+def build_screens():
+    global leader_screen, pause_screen
+    if leader_screen is None:
+        leader_screen = LeaderboardScreen(screen_rect, title_font, ui_font)
+        pause_screen = PauseScreen(screen_rect, title_font, ui_font)
 layout_hud_help()
 
 # =========================
-#    Timer snake (vitesse)
+#  Horloge de simulation (pas fixe)
 # =========================
-SNAKE_UPDATE = pygame.USEREVENT
-
-def set_snake_timer(interval_ms: int):
-    pygame.time.set_timer(SNAKE_UPDATE, 0)
-    pygame.time.set_timer(SNAKE_UPDATE, interval_ms)
+# Les ticks du serpent sont cadencés par un accumulateur indépendant du rendu :
+# Game.step tourne exactement tous les SPEED_INTERVALS ms, quel que soit le coût
+# d'une frame ; le rendu interpole entre deux ticks quand il est plus rapide.
+MAX_TICKS_PER_FRAME = 5   # rattrapage borné après une frame très lente
+
+class FixedStep:
+    def __init__(self, interval_ms):
+        self.interval = interval_ms
+        self.acc = 0.0
+    def set_interval(self, interval_ms):
+        self.interval = interval_ms
+        self.acc = min(self.acc, interval_ms)
+    def reset(self):
+        self.acc = 0.0
+    def advance(self, elapsed_ms):
+        """Ajoute le temps écoulé; renvoie le nombre de ticks à jouer."""
+        self.acc += elapsed_ms
+        n = int(self.acc // self.interval)
+        if n > MAX_TICKS_PER_FRAME:
+            profiler.add_dropped_ticks(n - MAX_TICKS_PER_FRAME)
+            n = MAX_TICKS_PER_FRAME
+            self.acc = 0.0
+        else:
+            self.acc -= n * self.interval
+        return n
+    def alpha(self):
+        return self.acc / self.interval
+
+sim_clock = FixedStep(SPEED_INTERVALS[current_speed])
+
+def start_game():
+    """Nouvelle partie avec une graine fraîche, notée dans le replay."""
+    global game, number_of_cells
+    if grid_choice != number_of_cells:
+        number_of_cells = grid_choice
+        game = engine.Game(number_of_cells, wrap_walls)
+        game.on_turn = replay_writer.on_turn
+        layout_board(screen_rect.w, screen_rect.h)
+        layout_hud_help()
+        dirty.mark_full()
+    seed = random.getrandbits(64)
+    game.wrap_walls = wrap_walls
+    game.reset(seed)
+    motion.reset()
+    sim_clock.set_interval(SPEED_INTERVALS[current_speed])
+    sim_clock.reset()
+    replay_writer.start(seed, game.cells, wrap_walls, current_speed)
+
+def run_tick():
+    """Joue un tick; renvoie False si la partie s'est terminée."""
+    snake = game.snake
+    old_head, old_tail, old_food = snake.head, snake.body[-1], game.food.position
+    demo = app_state == "DEMO"
+    result = demo_pilot.step() if demo else game.step()
+    dirty.note_step(game, old_tail, old_food)
+    motion.note_step(game, old_head, old_tail)
+    if demo:
+        if result in (engine.DEAD, engine.WON) or demo_pilot.stalled():
+            restart_demo()
+            return False
+    elif result == engine.WON:
+        game_over(won=True)
+        return False
+    elif result == engine.DEAD:
+        game_over()
+        return False
+    return True
 
-set_snake_timer(SPEED_INTERVALS[current_speed])
+# =========================
+#   Démo (écran d'attente)
+# =========================
+# Après DEMO_IDLE_S secondes sans entrée sur un écran au repos, le serpent joue
+# seul (autopilot.py) jusqu'à la première touche, clic ou mouvement de souris.
+# La démo a sa propre partie, à la taille de grille courante : une partie en
+# pause est mise de côté puis rendue telle quelle, et rien n'est enregistré.
+DEMO_IDLE_S = 30   # 0 = pas de démo
+DEMO_HINT = "Démo - appuyez sur une touche pour jouer"
+INPUT_EVENTS = (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION, pygame.MOUSEWHEEL)
+demo_pilot = None
+_player_game = None
+
+def start_demo():
+    global app_state, game, demo_pilot, _player_game
+    _player_game = game
+    # pilote (et son cycle hamiltonien) gardé tant que la grille ne change pas
+    if demo_pilot is None or demo_pilot.n != number_of_cells or demo_pilot.wrap != wrap_walls:
+        demo_pilot = Autopilot(engine.Game(number_of_cells, wrap_walls))
+    game = demo_pilot.game
+    restart_demo()
+    app_state = "DEMO"
+
+def restart_demo():
+    game.reset()
+    demo_pilot.reset()
+    motion.reset()
+    sim_clock.reset()
+    dirty.mark_full()
+
+def stop_demo():
+    global app_state, game
+    game = _player_game
+    motion.reset()
+    sim_clock.reset()
+    app_state = "MENU"
 
 # =========================
 #        Boucle
 # =========================
-while True:
-    dt = clock.tick(60)
-
-    # relancer l’anim du menu si besoin
-    if _prev_app_state != app_state and app_state == "MENU":
-        menu_screen.restart_anim()
-    _prev_app_state = app_state
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit(); sys.exit()
-
-        if event.type == pygame.VIDEORESIZE:
-            screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
-            screen_rect = screen.get_rect()
-            compute_layout_for_window(event.w, event.h)
-            menu_screen.apply_fonts(title_font, ui_font)
-            leader_screen.apply_fonts(title_font, ui_font)
-            pause_screen.apply_fonts(title_font, ui_font)
-            menu_screen.relayout(screen_rect)
-            leader_screen.relayout(screen_rect)
-            pause_screen.relayout(screen_rect)
-            layout_hud_help()
-
-        if app_state == "MENU":
-            action, payload = menu_screen.handle_event(event)
-            if action == "START":
-                pseudo = (payload or "").strip()
-                if not pseudo:
-                    menu_screen.message = "Veuillez entrer un pseudo."
-                elif not ALLOWED_USERNAME_RE.fullmatch(pseudo):
-                    menu_screen.message = "Le pseudo doit faire 3 à 20 caractères (lettres, chiffres, espace, _ ou -)."
-                else:
-                    try:
-                        current_player_name = pseudo
-                        current_player_id = db.get_or_create_player(pseudo)
-                    except ValueError as e:
-                        menu_screen.message = str(e)
-                    else:
-                        game.state = "PLAYING"
-                        app_state = "PLAYING"
-                        menu_screen.message = ""
-            elif action == "LEADERBOARD":
-                leader_screen.load_rows()
-                app_state = "LEADERBOARD"
-            elif action == "HELP_MENU":
-                app_state = "HELP_MENU"
-
-        elif app_state == "LEADERBOARD":
-            if leader_screen.handle_event(event) == "BACK":
-                app_state = "MENU"
-
-        elif app_state == "PLAYING":
-            if hud_help_btn.is_clicked(event):
-                app_state = "PAUSED"
-            if event.type == SNAKE_UPDATE:
-                game.update()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_p:
-                    app_state = "PAUSED"
-                if game.state == "STOPPED": game.state = "PLAYING"
-                if event.key == pygame.K_UP    and game.snake.direction != Vector2(0, 1):  game.snake.direction = Vector2(0, -1)
-                if event.key == pygame.K_DOWN  and game.snake.direction != Vector2(0,-1): game.snake.direction = Vector2(0, 1)
-                if event.key == pygame.K_LEFT  and game.snake.direction != Vector2(1, 0):  game.snake.direction = Vector2(-1, 0)
-                if event.key == pygame.K_RIGHT and game.snake.direction != Vector2(-1,0): game.snake.direction = Vector2(1, 0)
-
-        elif app_state in ("PAUSED", "HELP_MENU"):
-            show_resume = (app_state == "PAUSED")
-            nav = pause_screen.handle_event(event, show_resume=show_resume)
-            if nav == "RESUME":
-                app_state = "PLAYING"
-            elif nav == "MENU":
-                app_state = "MENU"
-
-    # --- DRAW ---
-    screen.fill(GREEN)
-
-    # Fond jungle
-    if app_state in ("MENU", "LEADERBOARD", "PAUSED", "HELP_MENU"):
-        if border_raw:
-            draw_border_at_rect(screen_fit_rect())
-    elif app_state == "PLAYING":
-        draw_fullscreen_border_with_board_hole()
+def draw_frame(dt):
+    """Dessine l'état courant; renvoie les rects modifiés, ou None pour tout l'écran."""
+    if app_state != dirty.state:
+        dirty.mark_full()
+        dirty.state = app_state
+    if app_state in ("PLAYING", "DEMO") and DIRTY_RECTS and not dirty.full:
+        rects = draw_playing_dirty()
+        profiler.lap("draw")
+        return rects
+
+    # Fond jungle (+ plateau et cadre selon l'état), depuis le cache
+    screen.blit(get_background(app_state), (0, 0))
+    profiler.lap("background")
 
     # UI / Jeu
     if app_state == "MENU":
-        menu_screen.update(dt)
         menu_screen.draw(screen)
 
     elif app_state == "LEADERBOARD":
         leader_screen.draw(screen)
 
-    elif app_state == "PLAYING":
-        pygame.draw.rect(
-            screen, DARK_GREEN,
-            (offset_x - 5, offset_y - 5, board_size + 10, board_size + 10),
-            5
-        )
-        game.draw()
-        hud_y = max(10, int(offset_y * 0.6))
-        blit_text_with_outline_topleft(
-            screen, "Snake Game", title_font, DARK_GREEN, WHITE,
-            offset_x - 5, hud_y, thickness=3
-        )
-        blit_text_with_outline_topright(
-            screen, str(game.score), score_font, DARK_GREEN, WHITE,
-            screen_rect.w - offset_x, hud_y, thickness=3
-        )
-        hud_help_btn.draw(screen)
+    elif app_state in ("PLAYING", "DEMO"):
+        if camera.enabled:
+            camera.follow(game.snake, motion.alpha)
+            camera.draw(screen, game)
+        else:
+            draw_game(game)
+        drawn = draw_hud(screen)
+        dirty.hud_area = drawn[0].unionall(drawn[1:])
+        dirty.score = game.score
+        dirty.hover = hud_help_btn.rect.collidepoint(pygame.mouse.get_pos())
+        dirty.cells.clear()
+        dirty.motion_cells = motion.cells(game.snake) if motion.active() else set()
+        dirty.full = False
+        if app_state == "DEMO":   # hors plateau et HUD : jamais recouvert par le rendu partiel
+            blit_text_with_outline_center(screen, DEMO_HINT, ui_font, DARK_GREEN, WHITE,
+                                          (screen_rect.centerx, screen_rect.h - max(16, offset_y // 2)))
 
     elif app_state in ("PAUSED", "HELP_MENU"):
         if app_state == "PAUSED":
-            pygame.draw.rect(
-                screen, DARK_GREEN,
-                (offset_x - 5, offset_y - 5, board_size + 10, board_size + 10),
-                5
-            )
-            hud_y = max(10, int(offset_y * 0.6))
-            blit_text_with_outline_topleft(
-                screen, "Snake Game", title_font, DARK_GREEN, WHITE,
-                offset_x - 5, hud_y, thickness=3
-            )
-            blit_text_with_outline_topright(
-                screen, str(game.score), score_font, DARK_GREEN, WHITE,
-                screen_rect.w - offset_x, hud_y, thickness=3
-            )
+            draw_hud(screen, with_help_btn=False)
         pause_screen.draw(screen, show_resume=(app_state == "PAUSED"))
+    profiler.lap("draw")
+    return None
 
+# =========================
+#   Rendu au repos (hors jeu)
+# =========================
+# Hors PLAYING, rien ne bouge la plupart du temps : la boucle dort sur
+# pygame.event.wait et ne redessine que sur entrée, changement de survol,
+# clignotement du curseur ou animation d'accueil du menu.
+IDLE_RENDER = True
+IDLE_STATES = ("MENU", "LEADERBOARD", "PAUSED", "HELP_MENU")
+IDLE_MAX_WAIT_MS = 1000
+FRAME_CAPS = {"PLAYING": 60, "MENU": 60, "LEADERBOARD": 30, "PAUSED": 30, "HELP_MENU": 30, "DEMO": 30}
+
+def screen_for_state(state):
+    if state == "MENU": return menu_screen
+    if state == "LEADERBOARD": return leader_screen
+    if state in ("PAUSED", "HELP_MENU"): return pause_screen
+    return None
+
+def hovered_button(state):
+    """Bouton survolé dans l'écran courant (pour ne redessiner qu'au changement)."""
+    scr = screen_for_state(state)
+    if scr is None:
+        return None
+    pos = pygame.mouse.get_pos()
+    for b in scr.buttons():
+        if b.rect.collidepoint(pos):
+            return b
+    return None
+
+def idle_wait_ms():
+    """Attente max avant la prochaine frame utile, ou None s'il faut animer en continu."""
+    if app_state == "MENU":
+        if menu_screen.animating():
+            return None
+        if menu_screen.input.blinking():
+            return menu_screen.input.ms_to_next_blink()
+    return IDLE_MAX_WAIT_MS
+
+KEY_DIRECTIONS = {
+    pygame.K_UP: engine.UP, pygame.K_DOWN: engine.DOWN,
+    pygame.K_LEFT: engine.LEFT, pygame.K_RIGHT: engine.RIGHT,
+}
+
+first_frame_ms = None
+
+def show_first_frame():
+    """Affiche le menu au plus tôt et mesure le temps depuis le lancement."""
+    global first_frame_ms
+    draw_frame(0)
     pygame.display.update()
+    first_frame_ms = (time.perf_counter() - T_START) * 1000
+    profiler.first_frame_ms = first_frame_ms
+
+def main():
+    global screen, screen_rect, app_state, _prev_app_state
+    global current_player_id, current_player_name
+    show_first_frame()
+    build_screens()
+    redraw = True
+    last_hover = None
+    last_frame = last_input = time.perf_counter()
+    while True:
+        events = []
+        if IDLE_RENDER and app_state in IDLE_STATES and not redraw:
+            wait_ms = idle_wait_ms()
+            if wait_ms is not None:
+                events.append(pygame.event.wait(wait_ms))
+        dt = clock.tick(FRAME_CAPS.get(app_state, 60))
+        now = time.perf_counter()
+        frame_ms = (now - last_frame) * 1000.0
+        last_frame = now
+        events.extend(pygame.event.get())
+        profiler.begin_frame()
+
+        # relancer l’anim du menu si besoin
+        if _prev_app_state != app_state and app_state == "MENU":
+            menu_screen.restart_anim()
+        prev_state = _prev_app_state
+        _prev_app_state = app_state
+
+        for event in events:
+            if event.type == pygame.NOEVENT:
+                continue
+            if event.type != pygame.MOUSEMOTION:
+                redraw = True
+            if event.type in INPUT_EVENTS:
+                last_input = now
+
+            if event.type == pygame.QUIT:
+                run_recorder.close()
+                settings.close()
+                db.close_all()
+                pygame.quit(); sys.exit()
+
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                dirty.mark_full()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+                dirty.mark_full()
+
+            if event.type == pygame.VIDEORESIZE:
+                dirty.mark_full()
+                screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                screen_rect = screen.get_rect()
+                compute_layout_for_window(event.w, event.h)
+                menu_screen.apply_fonts(title_font, ui_font)
+                leader_screen.apply_fonts(title_font, ui_font)
+                pause_screen.apply_fonts(title_font, ui_font)
+                menu_screen.relayout(screen_rect)
+                leader_screen.relayout(screen_rect)
+                pause_screen.relayout(screen_rect)
+                layout_hud_help()
+
+            if app_state == "MENU":
+                action, payload = menu_screen.handle_event(event)
+                if action == "START":
+                    menu_screen.message_color = ERROR_RED
+                    pseudo = (payload or "").strip()
+                    if not pseudo:
+                        menu_screen.message = "Veuillez entrer un pseudo."
+                    elif not ALLOWED_USERNAME_RE.fullmatch(pseudo):
+                        menu_screen.message = "Le pseudo doit faire 3 à 20 caractères (lettres, chiffres, espace, _ ou -)."
+                    else:
+                        try:
+                            current_player_name = pseudo
+                            current_player_id = db.get_or_create_player(pseudo)
+                        except ValueError as e:
+                            menu_screen.message = str(e)
+                        else:
+                            if game.ticks == 0:   # sinon reprise de la partie mise en pause
+                                start_game()
+                            app_state = "PLAYING"
+                            menu_screen.message = ""
+                elif action == "LEADERBOARD":
+                    leader_screen.load_rows()
+                    db.prefetch_leaderboards(SPEED_INTERVALS, grid_size=grid_choice)   # autres filtres prêts avant le clic
+                    app_state = "LEADERBOARD"
+                elif action == "HELP_MENU":
+                    app_state = "HELP_MENU"
+
+            elif app_state == "LEADERBOARD":
+                if leader_screen.handle_event(event) == "BACK":
+                    app_state = "MENU"
+
+            elif app_state == "PLAYING":
+                if hud_help_btn.is_clicked(event):
+                    app_state = "PAUSED"
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_p:
+                        app_state = "PAUSED"
+                    if event.key in KEY_DIRECTIONS:
+                        game.queue_turn(KEY_DIRECTIONS[event.key])
+
+            elif app_state in ("PAUSED", "HELP_MENU"):
+                show_resume = (app_state == "PAUSED")
+                nav = pause_screen.handle_event(event, show_resume=show_resume)
+                if nav == "RESUME":
+                    app_state = "PLAYING"
+                elif nav == "MENU":
+                    app_state = "MENU"
+
+            elif app_state == "DEMO":
+                if event.type in INPUT_EVENTS:   # consommé : ne tape rien dans le pseudo
+                    stop_demo()
+
+        if DEMO_IDLE_S and app_state in IDLE_STATES and now - last_input >= DEMO_IDLE_S:
+            start_demo()
+        profiler.lap("events")
+
+        # --- SIMULATION ---
+        if app_state in ("PLAYING", "DEMO"):
+            # pas de rattrapage du temps passé hors jeu (menu, pause)
+            ticks = sim_clock.advance(frame_ms) if prev_state == app_state else 0
+            for _ in range(ticks):
+                if not run_tick():
+                    break
+            motion.alpha = sim_clock.alpha() if INTERPOLATE else 1.0
+        profiler.lap("update")
+
+        if app_state == "MENU" and menu_screen.update(dt):
+            redraw = True
+        hover = hovered_button(app_state)
+        if hover is not last_hover:
+            last_hover = hover
+            redraw = True
+        if app_state != _prev_app_state or (app_state == "MENU" and menu_screen.animating()):
+            redraw = True
+        if IDLE_RENDER and app_state in IDLE_STATES and not redraw:
+            continue
+        redraw = False
+
+        # --- DRAW ---
+        rects = draw_frame(dt)
+        if profiler.enabled:
+            overlay = profiler.draw(screen)
+            if rects is not None:
+                rects.append(overlay)
+        if rects is None:
+            pygame.display.update()
+        elif rects:
+            pygame.display.update(rects)
+        profiler.lap("display")
+        profiler.end_frame()
+
+if __name__ == "__main__":
+    main()
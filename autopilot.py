@@ -0,0 +1,567 @@
+# autopilot.py
+# Pilote automatique pour le mode démo (et les tests en masse) : ne lit que
+# Game, Snake.body/occupied/direction et Food.position.
+#
+# - A* vers la pomme (heuristique de Manhattan, avec wrap si les bords sont
+#   traversables), accepté seulement si, une fois la pomme mangée, la tête peut
+#   encore rejoindre la queue (sinon le serpent s'enfermerait) ;
+# - à défaut, poursuite de la queue, puis le coup qui laisse le plus de place ;
+# - plateau dense : suivi d'un cycle hamiltonien dès que le corps est rangé
+#   dans l'ordre du cycle (le serpent ne peut alors plus se couper).
+# Le chemin calculé est gardé d'un tick à l'autre et n'est recalculé que si la
+# pomme a bougé ou si la case suivante est bloquée.
+#
+# Coût borné sur grand plateau : les recherches d'un tick partagent un budget
+# de cases (TICK_BUDGET, compté en cases et non en temps pour que la démo reste
+# déterministe), et « la queue est-elle atteignable ? » est une recherche menée
+# des deux côtés à la fois (arrêt dès qu'elles se rejoignent, ou dès que le plus
+# petit des deux espaces est épuisé).
+#
+# Route vers la queue (`escape`) : cases libres de la tête jusqu'à une voisine de
+# la queue. Elle reste libre d'un tick à l'autre (la tête en consomme le début,
+# la queue y ajoute la case qu'elle quitte) et fournit des coups sûrs sans
+# recherche. La route prouvée par le test de sécurité devient celle d'après la pomme.
+#
+# Les recherches sont des générateurs qui rendent la main (yield) quand le budget
+# du tick est épuisé. Celle vers la pomme reprend au tick suivant avec son tas et
+# son tampon : pour que son résultat reste juste, elle part de la case atteinte
+# en suivant la route vers la queue pendant au plus PLAN_TICKS ticks (plateau
+# connu d'avance), coups que le serpent joue pendant qu'elle avance. Une
+# recherche sans conclusion dans ce délai compte comme un échec.
+import heapq
+from array import array
+from collections import deque
+from itertools import chain, islice, repeat
+
+DENSE_RATIO = 0.5       # part du plateau occupée au-delà de laquelle on suit le cycle
+FOOD_RETRY_TICKS = 8    # en poursuite de queue, nouvel essai vers la pomme tous les N ticks
+STALL_LAPS = 2          # plateaux entiers parcourus sans pomme avant d'abandonner (boucle)
+TICK_BUDGET = 300       # cases tirées du tas au plus par tick, toutes recherches
+                        # confondues (~3 µs chacune : p99 sous la milliseconde)
+PATH_BUDGET = 150       # dont recherche vers la pomme quand le coup du tick en dépend
+                        # (le reste reste acquis à la poursuite de queue)
+PLAN_TICKS = 8          # ticks d'avance au plus pour une recherche vers la pomme reprise
+
+
+def hamiltonian_cycle(cells, wrap_walls=False):
+    """Ordre des cases d'un cycle passant par (presque) tout le plateau.
+
+    Bords traversables : cycle complet pour tout côté (chaque ligne décalée d'une
+    case). Côté pair : ligne 0 vers la droite, serpentin sur les colonnes 1..,
+    retour par la colonne 0. Côté impair : aucun cycle complet n'existe ; les deux
+    dernières lignes sont parcourues en zigzag vertical et la case (0, cells - 1)
+    reste hors du cycle.
+    """
+    n = cells
+    if wrap_walls:
+        order = []
+        for y in range(n):
+            start = -y % n
+            order.extend(y * n + (start + i) % n for i in range(n))
+        return order
+    order = list(range(n))
+    last = n - 1 if n % 2 == 0 else n - 3
+    for y in range(1, last + 1):
+        xs = range(n - 1, 0, -1) if y % 2 else range(1, n)
+        order.extend(y * n + x for x in xs)
+    if n % 2:
+        for k, x in enumerate(range(n - 1, 0, -1)):
+            ys = (n - 2, n - 1) if k % 2 == 0 else (n - 1, n - 2)
+            order.extend(y * n + x for y in ys)
+        order.extend(y * n for y in range(n - 2, 0, -1))
+    else:
+        order.extend(y * n for y in range(n - 1, 0, -1))
+    return order
+
+
+class _Neighbors(dict):
+    """Voisins de chaque case, calculés à la première demande (construire les
+    n² tuples d'avance coûterait une demi-seconde sur un plateau de 500)."""
+    def __init__(self, neighbors):
+        super().__init__()
+        self.neighbors = neighbors
+
+    def __missing__(self, cell):
+        value = self[cell] = self.neighbors(cell)
+        return value
+
+
+class Autopilot:
+    def __init__(self, game, dense_ratio=DENSE_RATIO):
+        self.game = game
+        self.dense_ratio = dense_ratio
+        self.n = game.cells
+        self.wrap = game.wrap_walls
+        order = hamiltonian_cycle(self.n, self.wrap)
+        self.cycle_len = len(order)
+        # tables par case en array (comme engine.FreeCells) : le ramasse-miettes
+        # ne les parcourt pas, une liste de n² cases lui coûte ~1,5 ms par passe à 500
+        self.cycle_next = array("i", [-1]) * (self.n * self.n)
+        self.cycle_index = array("i", [-1]) * (self.n * self.n)
+        for i, cell in enumerate(order):
+            self.cycle_next[cell] = order[(i + 1) % len(order)]
+            self.cycle_index[cell] = i
+        self.plans = 0            # nombre de recherches lancées (mesure)
+        n = self.n
+        size = n * n
+        self.adj = _Neighbors(self._neighbors)
+        # heuristique sans appel de fonction : fold[x1 - x2 + n] = écart sur un axe
+        self._xs = array("i", range(n)) * n
+        self._ys = array("i", chain.from_iterable(repeat(y, n) for y in range(n)))
+        self._fold = [min(abs(d), n - abs(d)) if self.wrap else abs(d) for d in range(-n, n)]
+        # état des recherches, réutilisé sans remise à zéro : une case n'est
+        # « vue » que si mark[cell] vaut le numéro de la recherche en cours
+        self._mark = array("q", bytes(8 * size))
+        self._cost = array("i", bytes(4 * size))
+        self._came = array("i", bytes(4 * size))
+        self._stamp = 0
+        # entrées des tas en un seul entier (comparaisons bien moins chères que des
+        # tuples) : priorité, puis profondeur inversée (A*), puis case sur `_bits` bits
+        self._bits = size.bit_length()
+        self._mask = (1 << self._bits) - 1
+        self.budget = TICK_BUDGET   # cases encore autorisées pour ce tick
+        self.reset()
+
+    def reset(self):
+        """À appeler après game.reset()."""
+        self.path = []            # cases à parcourir, la prochaine en dernier
+        self.target = None        # position de la pomme au dernier calcul de `path`
+        self.retry = 0            # ticks avant un nouvel essai vers la pomme
+        self.cycling = False      # corps rangé le long du cycle hamiltonien
+        self.idle_ticks = 0       # ticks depuis la dernière pomme (détection de boucle)
+        self.last_score = self.game.score
+        self.escape = None        # cases libres de la tête à une voisine de la queue (voir _track_escape)
+        self.escape_tail = -1     # queue au moment où `escape` a été mise à jour
+        self.escape_after = None  # (pomme, route, queue) : `escape` une fois la pomme du chemin mangée
+        self.job = None           # recherche vers la pomme en cours (générateur de _plan_search)
+        self.plan_ahead = False   # recherche en cours (ou la suivante) partie en avance
+
+    # --- Grille ---
+    def _neighbors(self, cell):
+        n = self.n
+        y, x = divmod(cell, n)
+        if self.wrap:
+            return (y * n + (x + 1) % n, y * n + (x - 1) % n,
+                    ((y + 1) % n) * n + x, ((y - 1) % n) * n + x)
+        out = []
+        if x + 1 < n: out.append(cell + 1)
+        if x > 0: out.append(cell - 1)
+        if y + 1 < n: out.append(cell + n)
+        if y > 0: out.append(cell - n)
+        return tuple(out)
+
+    def _new_stamp(self):
+        self._stamp += 1
+        return self._stamp
+
+    def _direction(self, a, b):
+        n = self.n
+        ay, ax = divmod(a, n)
+        by, bx = divmod(b, n)
+        dx, dy = bx - ax, by - ay
+        if dx > 1: dx = -1        # passage d'un bord à l'autre
+        elif dx < -1: dx = 1
+        if dy > 1: dy = -1
+        elif dy < -1: dy = 1
+        return (dx, dy)
+
+    def _passable(self, cell):
+        """Libre au prochain tick (la queue se libère, sauf si le serpent grandit)."""
+        snake = self.game.snake
+        return not snake.occupied[cell] or (cell == snake.body[-1] and not snake.new_block)
+
+    def _finish(self, search):
+        """Résultat de la recherche `search` si elle aboutit dans le budget du tick, sinon None."""
+        try:
+            next(search)
+        except StopIteration as done:
+            return done.value
+        search.close()
+        return None
+
+    def _astar(self, start, goal, occupied, passable=-1):
+        """Chemin de start à goal (start exclu, goal en premier), ou None.
+
+        Générateur : yield quand le budget du tick est épuisé, la recherche
+        reprend là où elle s'était arrêtée au tick suivant.
+        """
+        adj, xs, ys, fold = self.adj, self._xs, self._ys, self._fold
+        mark, cost, came = self._mark, self._cost, self._came
+        heappush, heappop = heapq.heappush, heapq.heappop
+        gx, gy = self.n - xs[goal], self.n - ys[goal]
+        stamp = self._new_stamp()
+        self.plans += 1
+        budget = self.budget
+        bits, mask = self._bits, self._mask
+        fbits = 2 * bits
+        mark[start], cost[start] = stamp, 0
+        heap = [((fold[xs[start] + gx] + fold[ys[start] + gy]) << fbits | mask << bits | start)]
+        while heap:
+            if budget <= 0:
+                self.budget = 0
+                yield
+                budget = self.budget
+            budget -= 1                   # chaque entrée du tas compte, même périmée
+            key = heappop(heap)
+            cell = key & mask
+            if cell == goal:
+                self.budget = budget
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = came[cell]
+                return path
+            g = mask - (key >> bits & mask)
+            if g > cost[cell]:
+                continue                  # entrée périmée (case déjà atteinte plus court)
+            g += 1
+            for nb in adj[cell]:
+                if occupied[nb] and nb != goal and nb != passable:
+                    continue
+                if mark[nb] != stamp or g < cost[nb]:
+                    mark[nb], cost[nb], came[nb] = stamp, g, cell
+                    # à f égal, le plus profond d'abord
+                    heappush(heap, (g + fold[xs[nb] + gx] + fold[ys[nb] + gy]) << fbits
+                             | (mask - g) << bits | nb)
+        self.budget = budget
+        return None
+
+    def _reaches(self, start, goal, occupied):
+        """Chemin de la case libre `start` jusqu'à une voisine de `goal` (start et
+        goal exclus, dans l'ordre de marche), ou None si aucun n'est trouvé.
+
+        Deux recherches gloutonnes alternées, l'une depuis start, l'autre depuis
+        les cases libres voisines de goal : elles se rejoignent vite si le chemin
+        existe, sinon la plus petite s'épuise en premier. Générateur, comme _astar.
+        """
+        adj, xs, ys, fold = self.adj, self._xs, self._ys, self._fold
+        mark, came = self._mark, self._came
+        heappush, heappop = heapq.heappush, heapq.heappop
+        if goal in adj[start]:
+            return []
+        self.plans += 1
+        n = self.n
+        side_a, side_b = self._new_stamp(), self._new_stamp()
+        to_goal = (n - xs[goal], n - ys[goal])
+        to_start = (n - xs[start], n - ys[start])
+        mark[start], came[start] = side_a, -1
+        bits, mask = self._bits, self._mask
+        heap_a = [start]
+        heap_b = []
+        for cell in adj[goal]:
+            if not occupied[cell]:
+                mark[cell], came[cell] = side_b, -1
+                heap_b.append((fold[xs[cell] + to_start[0]] + fold[ys[cell] + to_start[1]]) << bits | cell)
+        heapq.heapify(heap_b)
+        seen_a, seen_b = 1, len(heap_b)
+        budget = self.budget
+        while heap_a and heap_b:
+            if budget <= 0:
+                self.budget = 0
+                yield
+                budget = self.budget
+            budget -= 1
+            if seen_a <= seen_b:
+                heap, own, other, target, (tx, ty) = heap_a, side_a, side_b, goal, to_goal
+            else:
+                heap, own, other, target, (tx, ty) = heap_b, side_b, side_a, start, to_start
+            cell = heappop(heap) & mask
+            for nb in adj[cell]:
+                m = mark[nb]
+                if m == other or nb == target:
+                    # jonction : côté start (a) jusqu'à la jonction, puis côté goal (b)
+                    self.budget = max(budget, 0)
+                    a, b = (cell, nb) if own == side_a else (nb, cell)
+                    route = []
+                    while a != start and a != goal:
+                        route.append(a)
+                        a = came[a]
+                    route.reverse()
+                    while b != -1 and b != start and b != goal:
+                        route.append(b)
+                        b = came[b]
+                    return route
+                if m == own or occupied[nb]:
+                    continue
+                mark[nb], came[nb] = own, cell
+                heappush(heap, (fold[xs[nb] + tx] + fold[ys[nb] + ty]) << bits | nb)
+                if own == side_a:
+                    seen_a += 1
+                else:
+                    seen_b += 1
+        self.budget = max(budget, 0)
+        return None
+
+    # --- Sécurité ---
+    def _safe_after(self, path, body, occupied):
+        """La tête peut-elle rejoindre la queue une fois `path` suivi et la pomme
+        mangée (corps `body` et cases `occupied` au départ) ? Générateur : renvoie
+        la route vers la queue à ce moment-là (voir escape_after), ou None."""
+        k, length = len(path), len(body)
+        occupied = bytearray(occupied)
+        for cell in islice(reversed(body), min(k, length)):
+            occupied[cell] = 0                       # cases libérées par la queue
+        for cell in path:
+            occupied[cell] = 1
+        head = path[0]
+        tail = path[length - 1] if k >= length else body[length - k - 1]
+        # après la pomme la queue ne bouge pas au tick suivant : il faut un détour
+        for start in self.adj[head]:
+            if start == tail or occupied[start]:
+                continue
+            route = yield from self._reaches(start, tail, occupied)
+            if route is not None:
+                return head, [start] + route, tail
+        return None
+
+    def _roomiest_move(self):
+        """Case voisine libre d'où l'on atteint le plus de cases (borné à la longueur
+        du serpent et au quart de TICK_BUDGET, dernier recours pris hors budget)."""
+        snake = self.game.snake
+        adj, mark, passable = self.adj, self._mark, self._passable
+        limit = min(len(snake.body) + 1, TICK_BUDGET // 4)
+        best, best_room = None, -1
+        for start in adj[snake.head]:
+            if not passable(start):
+                continue
+            stamp = self._new_stamp()
+            mark[start] = stamp
+            room = 1
+            todo = [start]
+            while todo and room < limit:
+                for nb in adj[todo.pop()]:
+                    if mark[nb] != stamp and passable(nb):
+                        mark[nb] = stamp
+                        room += 1
+                        todo.append(nb)
+            if room > best_room:
+                best, best_room = start, room
+        return best
+
+    # --- Cycle hamiltonien ---
+    def _on_cycle(self):
+        """Le corps est-il rangé dans l'ordre du cycle (queue -> tête) ?
+
+        Dans ce cas, suivre le cycle est sûr jusqu'à la fin de la partie : les
+        cases devant la tête jusqu'à la queue sont toutes libres.
+        """
+        index = self.cycle_index
+        body = self.game.snake.body
+        size = self.cycle_len
+        tail = index[body[-1]]
+        if tail < 0:
+            return False
+        last = -1
+        for cell in reversed(body):
+            i = index[cell]
+            if i < 0:
+                return False
+            d = (i - tail) % size
+            if d <= last:
+                return False
+            last = d
+        return True
+
+    # --- Route vers la queue ---
+    def _track_escape(self):
+        """Met à jour la route de _chase_tail après le tick joué : la tête a pris sa
+        première case, la queue a libéré la sienne (ajoutée au bout). Tout autre
+        coup de la tête la rend caduque. Pomme du chemin tout juste mangée : la
+        route prouvée par _safe_after prend le relais si le plateau est bien celui prévu."""
+        snake = self.game.snake
+        head, tail = snake.head, snake.body[-1]
+        after = self.escape_after
+        if after is not None and head == after[0]:
+            self.escape_after = None
+            _, cells, after_tail = after
+            occupied = snake.occupied
+            if tail == after_tail and not any(occupied[cell] for cell in cells):
+                self.escape, self.escape_tail = deque(cells), tail
+                return
+        escape = self.escape
+        if escape is None:
+            return
+        if escape and head == escape[0]:
+            escape.popleft()
+        elif escape or head != self.escape_tail:
+            self.escape = None
+            return
+        if tail != self.escape_tail:
+            if self.escape_tail != head:
+                escape.append(self.escape_tail)
+            self.escape_tail = tail
+
+    # --- Décision ---
+    def _committed(self, limit):
+        """Jusqu'à `limit` prochains coups déjà prouvés sûrs : la route vers la queue,
+        puis le corps depuis la queue (libéré avant que la tête n'y arrive)."""
+        escape, snake = self.escape, self.game.snake
+        if escape is None or (snake.new_block and not escape):
+            return []
+        moves = list(islice(escape, limit))
+        moves.extend(islice(reversed(snake.body), min(limit - len(moves), len(snake.body) - 2)))
+        return moves
+
+    def _plan_search(self, head, food, body, occupied, passable):
+        """Chemin sûr de head à la pomme sur le plateau donné, et la route vers la
+        queue une fois la pomme mangée (générateur) : (chemin, escape_after) ou None."""
+        path = yield from self._astar(head, food, occupied, passable)
+        if path is None:
+            return None
+        after = yield from self._safe_after(path, body, occupied)
+        return None if after is None else (path, after)
+
+    def _plan(self):
+        """Lance la recherche d'un chemin sûr vers la pomme : depuis la tête, ou si la
+        précédente a manqué de budget, depuis la case atteinte après les coups de
+        _committed (joués pendant qu'elle avance, voir _resume_plan)."""
+        snake = self.game.snake
+        food = self.game.food.position
+        ahead = self._committed(PLAN_TICKS) if self.plan_ahead and self.target == food else []
+        self.path, self.target = [], food
+        self.retry = FOOD_RETRY_TICKS
+        self.job = self.escape_after = None
+        if food < 0:
+            return
+        body, occupied = snake.body, snake.occupied
+        if food in ahead:
+            ahead = ahead[:ahead.index(food)]     # s'arrêter juste avant la pomme
+        if ahead:
+            # plateau après ces coups : la tête les a occupés, la queue a libéré les siens
+            length = len(body) + snake.new_block
+            keep = max(0, length - len(ahead))
+            occupied = bytearray(occupied)
+            for cell in islice(reversed(body), len(body) - keep):
+                occupied[cell] = 0
+            moved = ahead[:-length - 1:-1]          # les `length` dernières cases, tête d'abord
+            for cell in moved:
+                occupied[cell] = 1
+            body = moved + list(islice(body, keep))
+            passable = body[-1]
+            self.path = ahead[::-1]
+        else:
+            passable = -1 if snake.new_block else body[-1]
+            if snake.new_block:
+                body = list(body) + [body[-1]]      # la queue reste un tick de plus en place
+        self.plan_ahead = bool(ahead)
+        self.job = self._plan_search(body[0], food, body, occupied, passable)
+        self._resume_plan()
+
+    def _resume_plan(self):
+        """Fait avancer la recherche vers la pomme avec le budget du tick. Tant qu'elle
+        n'a pas abouti, `path` ne contient que les coups d'avance; s'il n'en reste
+        plus, elle est abandonnée."""
+        # coup du tick encore à trouver : garder de quoi poursuivre la queue
+        reserve = 0 if self.path else max(0, self.budget - PATH_BUDGET)
+        self.budget -= reserve
+        try:
+            next(self.job)
+        except StopIteration as done:
+            self.job = None
+            self.plan_ahead = False
+            if done.value is None:
+                self.path = []            # reprendre la poursuite de queue (et ses détours)
+            else:
+                path, self.escape_after = done.value
+                self.path = path + self.path
+        else:
+            if not self.path:
+                # à court de budget depuis la tête : nouvel essai au tick suivant, en avance
+                self.job = None
+                self.plan_ahead = not self.plan_ahead
+                if self.plan_ahead:
+                    self.retry = 1
+        self.budget += reserve
+
+    def _chase_tail(self, dense=False):
+        """Case voisine d'où la queue reste atteignable, la plus loin possible de la pomme
+        (le serpent fait des détours et libère de la place au lieu de tourner en rond).
+        Sur plateau dense, la case suivante du cycle d'abord : le corps s'y range peu à peu."""
+        game, snake = self.game, self.game.snake
+        n, wrap = self.n, self.wrap
+        fy, fx = divmod(max(game.food.position, 0), n)
+
+        def away(cell):
+            y, x = divmod(cell, n)
+            dx, dy = abs(x - fx), abs(y - fy)
+            if wrap:
+                dx, dy = min(dx, n - dx), min(dy, n - dy)
+            return dx + dy
+
+        head, tail = snake.head, snake.body[-1]
+        # coup déjà prouvé sûr par la route du tick précédent
+        certified = None
+        if self.escape:
+            certified = self.escape[0]
+        elif self.escape is not None and not snake.new_block:
+            certified = tail
+        occupied = bytearray(snake.occupied)
+        if not snake.new_block:
+            occupied[tail] = 0
+            tail = snake.body[-2]    # nouvelle queue après le mouvement
+        order = sorted(self.adj[head], key=away, reverse=True)
+        if dense and self.cycle_next[head] in order:
+            order.remove(self.cycle_next[head])
+            order.insert(0, self.cycle_next[head])
+        for cell in order:
+            if occupied[cell]:
+                continue
+            if cell == certified:
+                return cell
+            occupied[cell] = 1
+            route = self._finish(self._reaches(cell, tail, occupied))
+            occupied[cell] = 0
+            if route is not None:
+                self.escape = deque([cell] + route)
+                self.escape_tail = tail
+                return cell
+        return None
+
+    def next_direction(self):
+        """Direction à jouer au prochain tick (à passer à game.step)."""
+        game, snake = self.game, self.game.snake
+        self.budget = TICK_BUDGET
+        self._track_escape()
+        if game.score != self.last_score:
+            self.last_score = game.score
+            self.idle_ticks = 0
+        self.idle_ticks += 1
+        head, food = snake.head, game.food.position
+
+        # plateau dense : suivre le cycle, une fois le corps rangé dans son ordre
+        # (pas si la pomme est sur la case hors cycle d'un côté impair)
+        dense = len(snake.body) >= self.dense_ratio * self.cycle_len
+        if dense and food >= 0 and self.cycle_index[food] >= 0:
+            if not self.cycling and self.idle_ticks % FOOD_RETRY_TICKS == 1:
+                self.cycling = self._on_cycle()
+            if self.cycling:
+                self.path, self.job, self.escape_after = [], None, None
+                nxt = self.cycle_next[head]
+                if nxt >= 0 and self._passable(nxt):
+                    return self._direction(head, nxt)
+                self.cycling = False
+
+        if self.path and (self.target != food or not self._passable(self.path[-1])):
+            self.path = []
+            self.job = self.escape_after = None
+        if self.job is not None:
+            self._resume_plan()
+        elif not self.path:
+            self.retry -= 1
+            if self.target != food or self.retry <= 0:
+                self._plan()
+        if self.path:
+            return self._direction(head, self.path.pop())
+        # pas de chemin sûr vers la pomme : suivre sa queue en attendant mieux
+        nxt = self._chase_tail(dense)
+        if nxt is None:
+            nxt = self._roomiest_move()
+        return snake.direction if nxt is None else self._direction(head, nxt)
+
+    def stalled(self):
+        """Le serpent tourne en rond sans plus rien manger (démo : recommencer)."""
+        return self.idle_ticks > STALL_LAPS * self.n * self.n
+
+    def step(self):
+        """Joue un tick piloté; renvoie le résultat de game.step."""
+        return self.game.step(self.next_direction())
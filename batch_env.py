@@ -0,0 +1,171 @@
+# batch_env.py
+# N parties jouées en lot avec NumPy (réglage des bots, apprentissage) :
+#
+#   env = BatchEnv(4096, cells=25)
+#   obs, reward, done = env.reset(), None, None
+#   obs, reward, done = env.step(actions)   # actions : index dans engine.DIRECTIONS, -1 = tout droit
+#
+# Mêmes règles que engine.Game.step (demi-tour ignoré, murs ou bords
+# traversables, la queue libère sa case avant le test de collision, croissance
+# au tick qui suit la pomme, victoire quand plus aucune case n'est libre), mais
+# pas le même tirage des pommes : les parties ne sont pas rejouables par Game.
+#
+# Tout l'état tient dans des tableaux (N, cells * cells) : grille (0 vide,
+# 1 corps, 2 tête, 3 pomme), corps en tampon circulaire (queue -> tête), plus
+# tête, longueur, direction, pomme et score par partie. Un tick = quelques
+# opérations vectorisées sur les N parties, sans boucle Python par partie
+# (hors tirage des pommes sur plateau presque plein).
+#
+# NumPy n'est requis que par ce module (pip install numpy); le jeu ne l'importe pas.
+import numpy as np
+
+from engine import DIRECTIONS, RIGHT, DEFAULT_CELLS
+
+EMPTY, BODY, HEAD, FOOD = 0, 1, 2, 3
+REWARD_FOOD = 1.0
+REWARD_DEATH = -1.0
+FOOD_TRIES = 8   # tirages au hasard avant de chercher parmi les cases libres
+
+_DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+_DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+_OPPOSITE = np.array([DIRECTIONS.index((-dx, -dy)) for dx, dy in DIRECTIONS], dtype=np.int8)
+
+
+class BatchEnv:
+    """Lot de `n_games` parties sur des grilles `cells` x `cells`.
+
+    step() et reset() renvoient des vues sur les tampons internes (pas de
+    copie) : ils sont réécrits au tick suivant, copier ce qu'il faut garder.
+    """
+    def __init__(self, n_games, cells=DEFAULT_CELLS, wrap_walls=False, seed=None):
+        if cells < 4:
+            raise ValueError("Grid must be at least 4 cells wide")
+        self.n_games = n = n_games
+        self.cells = cells
+        self.wrap_walls = wrap_walls
+        self.rng = np.random.default_rng(seed)
+        size = self.size = cells * cells
+        self.grid = np.zeros((n, size), dtype=np.int8)
+        self.body = np.zeros((n, size), dtype=np.int32)    # tampon circulaire des cases du corps
+        self.head_ptr = np.zeros(n, dtype=np.int32)        # index de la tête dans `body`
+        self.length = np.zeros(n, dtype=np.int32)
+        self.head = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)        # index dans DIRECTIONS
+        self.grow = np.zeros(n, dtype=bool)                # pomme mangée au tick précédent
+        self.food = np.zeros(n, dtype=np.int32)            # -1 : plateau plein (gagné)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.final_score = np.zeros(n, dtype=np.int32)     # score des parties finies à ce tick
+        self.reward = np.zeros(n, dtype=np.float32)
+        self.done = np.zeros(n, dtype=bool)
+        self.obs = self.grid.reshape(n, cells, cells)      # vue, pas de copie
+        self._grid = self.grid.reshape(-1)
+        self._body = self.body.reshape(-1)
+        self._base = np.arange(n, dtype=np.int64) * size   # début de chaque partie dans les vues à plat
+        x, y = min(6, cells - 2), min(9, cells // 2)       # même départ que engine.Snake
+        self._start = np.array([y * cells + x - i for i in (2, 1, 0)], dtype=np.int32)   # queue -> tête
+
+    def reset(self):
+        self._reset_rows(np.arange(self.n_games))
+        self.reward.fill(0)
+        self.done.fill(False)
+        return self.obs
+
+    def _reset_rows(self, rows):
+        start = self._start
+        self.grid[rows] = EMPTY
+        self.grid[rows[:, None], start[:-1]] = BODY
+        self.grid[rows, start[-1]] = HEAD
+        self.body[rows[:, None], np.arange(len(start))] = start
+        self.head_ptr[rows] = len(start) - 1
+        self.length[rows] = len(start)
+        self.head[rows] = start[-1]
+        self.direction[rows] = DIRECTIONS.index(RIGHT)
+        self.grow[rows] = False
+        self.score[rows] = 0
+        self.ticks[rows] = 0
+        self._place_food(rows)
+
+    def _place_food(self, rows):
+        """Pomme sur une case libre tirée au hasard pour chaque partie de `rows`."""
+        grid = self._grid
+        pending = rows
+        for _ in range(FOOD_TRIES):
+            cells = self.rng.integers(0, self.size, len(pending), dtype=np.int32)
+            free = grid[self._base[pending] + cells] == EMPTY
+            got = pending[free]
+            self.food[got] = cells[free]
+            grid[self._base[got] + cells[free]] = FOOD
+            pending = pending[~free]
+            if not len(pending):
+                return
+        for row in pending:   # plateau presque plein : tirage parmi les cases libres
+            free = np.flatnonzero(self.grid[row] == EMPTY)
+            if len(free):
+                cell = free[self.rng.integers(len(free))]
+                self.food[row] = cell
+                self.grid[row, cell] = FOOD
+            else:
+                self.food[row] = -1
+
+    def step(self, actions):
+        """Joue un tick dans chaque partie; renvoie (obs, reward, done).
+
+        `actions` : tableau de N index dans engine.DIRECTIONS (-1 = garder la
+        direction). Une partie finie (reward -1 si perdue) est aussitôt remise
+        à zéro : `obs` montre alors la nouvelle partie et `final_score` le
+        score atteint.
+        """
+        n, grid, base = self.cells, self._grid, self._base
+        actions = np.asarray(actions)
+        direction = self.direction
+        np.copyto(direction, actions, where=(actions >= 0) & (actions != _OPPOSITE[direction]),
+                  casting="unsafe")
+
+        y, x = np.divmod(self.head, n)
+        x += _DX[direction]
+        y += _DY[direction]
+        if self.wrap_walls:
+            x %= n
+            y %= n
+            dead = np.zeros(self.n_games, dtype=bool)
+        else:
+            dead = (x < 0) | (x >= n) | (y < 0) | (y >= n)
+            np.clip(x, 0, n - 1, out=x)
+            np.clip(y, 0, n - 1, out=y)
+        cell = y * n + x
+
+        # la queue libère sa case avant le test, sauf si le serpent grandit
+        moving = ~self.grow
+        tail = base + self._body[base + (self.head_ptr - self.length + 1) % self.size]
+        grid[tail] = np.where(moving, EMPTY, grid[tail])
+        self.length -= moving
+
+        target = base + cell
+        dead |= grid[target] == BODY
+        ate = (cell == self.food) & ~dead
+        grid[base + self.head] = BODY
+        grid[target] = HEAD
+        self.head_ptr += 1
+        self.head_ptr %= self.size
+        self._body[base + self.head_ptr] = cell
+        self.length += 1
+        self.head[:] = cell
+        self.grow[:] = ate
+        self.score += ate
+        self.ticks += 1
+
+        eaters = np.flatnonzero(ate)
+        if len(eaters):
+            self._place_food(eaters)
+        np.logical_or(dead, ate & (self.food < 0), out=self.done)
+        reward = self.reward
+        reward.fill(0)
+        reward[ate] = REWARD_FOOD
+        reward[dead] = REWARD_DEATH
+
+        finished = np.flatnonzero(self.done)
+        if len(finished):
+            self.final_score[finished] = self.score[finished]
+            self._reset_rows(finished)
+        return self.obs, self.reward, self.done
@@ -0,0 +1,349 @@
+# bench.py
+# Benchmarks des chemins chauds (moteur, rendu, base), exécutables sans écran.
+#
+#   python bench.py                              # tout, résultats JSON sur stdout
+#   python bench.py --only engine,food --out bench.json
+#   python bench.py --db-sizes 10000,1000000,10000000
+#   python bench.py --baseline base.json --threshold 0.15   # code 1 si régression
+#
+# Code 1 aussi si une requête par période lit runs sans index, ou si le p99
+# d'un tick du pilote automatique dépasse AUTOPILOT_P99_NS.
+#
+# Chaque résultat est un temps par opération (ns/op, meilleur de plusieurs
+# séries) : comparé à une référence JSON, un résultat plus lent que
+# (1 + threshold) x la référence est signalé comme régression.
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")   # stdout reste du JSON pur
+
+import autopilot
+import db
+import engine
+
+SPEEDS = ("facile", "normal", "difficile")
+AUTOPILOT_P99_NS = 1_000_000   # p99 d'un tick du pilote : bien moins d'une image
+
+
+def measure(fn, min_time=0.2, repeats=3):
+    """ns par appel de `fn` (meilleure de `repeats` séries d'au moins `min_time` s)."""
+    n = 1
+    while True:   # calibrage du nombre d'appels par série
+        t0 = time.perf_counter_ns()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter_ns() - t0
+        if elapsed >= min_time * 1e9 / 4:
+            break
+        n *= 2
+    best = elapsed / n
+    for _ in range(repeats - 1):
+        t0 = time.perf_counter_ns()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter_ns() - t0) / n)
+    return best
+
+
+# --- Moteur ---
+def bench_engine(results, quick):
+    lengths = (3, 100, 1000) if quick else (3, 100, 1000, 10000)
+    cells = 128
+    order = autopilot.hamiltonian_cycle(cells)
+    nxt = {order[i]: order[(i + 1) % len(order)] for i in range(len(order))}
+    for length in lengths:
+        game = engine.Game(cells, wrap_walls=False, rng=random.Random(0))
+        snake = game.snake
+        for cell in snake.body:
+            snake.occupied[cell] = 0
+            snake.free.add(cell)
+        snake.body.clear()
+        for cell in reversed(order[:length]):   # tête = order[length - 1]
+            snake.body.append(cell)
+            snake.occupied[cell] = 1
+            snake.free.remove(cell)
+        game.food.position = -1   # pas de croissance : longueur constante
+        state = {"cell": snake.head}
+
+        def tick():
+            head = state["cell"]
+            to = nxt[head]
+            hy, hx = divmod(head, cells)
+            ty, tx = divmod(to, cells)
+            snake.direction = snake.heading = (tx - hx, ty - hy)
+            if game.step() == engine.DEAD:
+                raise RuntimeError("benchmark snake died")
+            state["cell"] = to
+        results[f"engine.step.len{length}"] = measure(tick)
+
+
+def bench_food(results, quick):
+    ratios = (0.01, 0.5, 0.99) if quick else (0.01, 0.25, 0.5, 0.75, 0.9, 0.99)
+    for cells in (25, 200):
+        for ratio in ratios:
+            rng = random.Random(1)
+            free = engine.FreeCells(cells * cells)
+            taken = rng.sample(range(cells * cells), int(cells * cells * ratio))
+            for cell in taken:
+                free.remove(cell)
+            food = engine.Food(cells, rng, free)
+            results[f"food.place.{cells}x{cells}.fill{int(ratio * 100)}"] = \
+                measure(lambda: food.generate_random_position(free))
+
+
+def tick_times(fn, ticks):
+    """Durées (ns) de `ticks` appels successifs de `fn`, triées."""
+    times = []
+    for _ in range(ticks):
+        t0 = time.perf_counter_ns()
+        fn()
+        times.append(time.perf_counter_ns() - t0)
+    times.sort()
+    return times
+
+
+def bench_autopilot(results, quick):
+    # décisions du pilote de la démo, parties enchaînées : moyenne, p99 et pire
+    # tick (c'est le pire qui fait sauter une image sur grand plateau)
+    ticks = 5_000 if quick else 30_000
+    for cells in ((25, 100) if quick else (25, 100, 250, 500)):
+        game = engine.Game(cells, wrap_walls=False, rng=random.Random(0))
+        pilot = autopilot.Autopilot(game)
+
+        def tick():
+            if game.over or pilot.stalled():
+                game.reset()
+                pilot.reset()
+            pilot.step()
+        times = tick_times(tick, ticks)
+        name = f"autopilot.tick.{cells}x{cells}"
+        results[name] = sum(times) / len(times)
+        results[name + ".p99"] = times[len(times) * 99 // 100]
+        results[name + ".max"] = times[-1]
+
+
+def bench_batch(results, quick):
+    # NumPy requis : groupe à demander explicitement (--only batch)
+    import numpy as np
+    import batch_env
+    for n_games in ((4096,) if quick else (1024, 4096, 16384)):
+        env = batch_env.BatchEnv(n_games, 25, seed=0)
+        env.reset()
+        actions = np.random.default_rng(0).integers(-1, 4, (64, n_games)).astype(np.int8)
+        it = iter(range(1 << 62))
+        ns = measure(lambda: env.step(actions[next(it) % 64]))
+        results[f"batch.step.25x25.n{n_games}"] = ns / n_games   # par partie et par tick
+
+
+# --- Rendu ---
+def bench_draw(results, quick):
+    import pygame
+    import Snake
+    Snake.build_screens()
+    Snake.leader_screen.load_rows()
+    for state in ("MENU", "LEADERBOARD", "PLAYING", "PAUSED", "HELP_MENU"):
+        Snake.app_state = state
+
+        def frame():
+            Snake.dirty.mark_full()
+            Snake.draw_frame(16)
+            pygame.display.update()
+        results[f"draw.full.{state}"] = measure(frame)
+
+    # PLAYING en zones sales : un tick puis une frame partielle
+    Snake.app_state = "PLAYING"
+    Snake.draw_frame(16)
+
+    def dirty_frame():
+        if not Snake.run_tick():
+            Snake.app_state = "PLAYING"
+        rects = Snake.draw_frame(16)
+        pygame.display.update(rects)
+    results["draw.dirty.PLAYING"] = measure(dirty_frame)
+
+    # grand plateau : vue caméra
+    Snake.grid_choice = 500
+    Snake.start_game()
+    Snake.app_state = "PLAYING"
+    Snake.draw_frame(16)
+    results["draw.camera.PLAYING.500"] = measure(dirty_frame)
+    Snake.run_recorder.flush()
+
+
+# --- Démarrage ---
+STARTUP_SCRIPT = "import sys, db; db.DB_PATH = sys.argv[1]; import Snake; Snake.show_first_frame(); print(Snake.first_frame_ms)"
+
+
+def bench_startup(results, quick):
+    """Temps jusqu'au premier affichage (processus neuf, base déjà migrée)."""
+    runs = 3 if quick else 7
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        times = []
+        for i in range(runs + 1):   # le premier lancement crée la base
+            out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, path],
+                                 capture_output=True, text=True, check=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)))
+            ms = float(out.stdout.strip().splitlines()[-1])
+            if i == 0:
+                results["startup.first_frame.new_db"] = ms * 1e6
+            else:
+                times.append(ms)
+        results["startup.first_frame"] = min(times) * 1e6
+
+
+# --- Base ---
+def populate(n_runs, n_players=1000, seed=0):
+    """Remplit la base courante avec `n_runs` runs répartis sur l'année écoulée."""
+    rng = random.Random(seed)
+    conn = db.get_conn()
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO players(username) VALUES (?)",
+                         [(f"player{i:05d}",) for i in range(n_players)])
+    now = time.time()
+    batch = 100_000
+    for start in range(0, n_runs, batch):
+        rows = []
+        for _ in range(min(batch, n_runs - start)):
+            ts = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now - rng.random() * 365 * 86400))
+            rows.append((rng.randint(1, n_players), rng.randint(0, 300),
+                         rng.choice(SPEEDS), rng.randint(0, 1), ts))
+        with conn:
+            conn.executemany("""
+                INSERT INTO runs(player_id, score, speed_mode, wrap_walls, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+    db.rebuild_rollups()
+    conn.execute("ANALYZE")
+
+
+def bench_db(results, sizes, plans):
+    saved_path = db.DB_PATH
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = os.path.join(tmp, "bench.db")
+            db.init_db()
+            populate(size)
+            combos = [(p, s, w) for p in db.PERIODS for s in (None,) + SPEEDS for w in (None, True, False)]
+            it = iter(range(1 << 62))
+
+            def lb_rollup():
+                p, s, w = combos[next(it) % len(combos)]
+                db.leaderboard(p, 10, s, w)
+
+            def lb_range():
+                p, s, w = combos[next(it) % len(combos)]
+                db.leaderboard(p, db.ROLLUP_SIZE + 1, s, w)
+
+            rng = random.Random(3)
+
+            def record():
+                db.record_run(rng.randint(0, 300), rng.randint(1, 1000),
+                              speed_mode=rng.choice(SPEEDS), wrap_walls=rng.randint(0, 1))
+            results[f"db.leaderboard.rollup.{size}"] = measure(lb_rollup)
+            results[f"db.leaderboard.range.{size}"] = measure(lb_range, min_time=0.5)
+            results[f"db.record_run.{size}"] = measure(record)
+            for p, s, w in combos:
+                plan = db.explain_leaderboard(p, db.ROLLUP_SIZE + 1, s, w)
+                plans[f"{size}:{p}:{s}:{w}"] = plan
+            db.close_all()
+    db.DB_PATH = saved_path
+
+
+def check_plans(plans):
+    """Toutes les requêtes par période doivent passer par un index (jamais SCAN runs)."""
+    return sorted(key for key, plan in plans.items()
+                  if any(step.startswith("SCAN runs") for step in plan))
+
+
+def check_autopilot(results):
+    """Grilles dont le p99 d'un tick du pilote dépasse AUTOPILOT_P99_NS."""
+    return sorted(name for name, value in results.items()
+                  if name.startswith("autopilot.tick.") and name.endswith(".p99")
+                  and value > AUTOPILOT_P99_NS)
+
+
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, value in results.items():
+        ref = baseline.get(name)
+        if ref and value > ref * (1 + threshold):
+            regressions[name] = {"baseline": ref, "current": value, "ratio": round(value / ref, 3)}
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks headless du jeu Snake")
+    parser.add_argument("--only", default="engine,food,autopilot,draw,db,startup",
+                        help="groupes à lancer (engine,food,autopilot,draw,db,startup; batch avec NumPy)")
+    parser.add_argument("--db-sizes", default="10000,100000",
+                        help="tailles des bases générées (ex. 10000,1000000,10000000)")
+    parser.add_argument("--quick", action="store_true", help="moins de points de mesure")
+    parser.add_argument("--out", help="fichier JSON de sortie (défaut : stdout)")
+    parser.add_argument("--baseline", help="JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="régression tolérée (0.10 = +10%%)")
+    args = parser.parse_args(argv)
+    groups = set(args.only.split(","))
+
+    results, plans = {}, {}
+    if "engine" in groups:
+        bench_engine(results, args.quick)
+    if "food" in groups:
+        bench_food(results, args.quick)
+    if "autopilot" in groups:
+        bench_autopilot(results, args.quick)
+    if "batch" in groups:
+        bench_batch(results, args.quick)
+    if "db" in groups:
+        bench_db(results, [int(n) for n in args.db_sizes.split(",") if n], plans)
+    if "startup" in groups:
+        bench_startup(results, args.quick)
+    if "draw" in groups:
+        # Snake ouvre la base à l'import : on le fait pointer sur une base jetable
+        tmp = tempfile.mkdtemp()
+        db.DB_PATH = os.path.join(tmp, "bench.db")
+        bench_draw(results, args.quick)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+        "unit": "ns/op",
+        "results": {k: round(v, 1) for k, v in results.items()},
+    }
+    status = 0
+    if plans:
+        report["unindexed_plans"] = check_plans(plans)
+        if report["unindexed_plans"]:
+            status = 1
+    if "autopilot" in groups:
+        report["slow_autopilot"] = check_autopilot(results)
+        if report["slow_autopilot"]:
+            status = 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        report["regressions"] = compare(report["results"], baseline, args.threshold)
+        if report["regressions"]:
+            status = 1
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# bulk.py
+# Export et import en masse de snake.db, en mémoire constante.
+#
+#   python bulk.py export runs runs.csv          # runs | players | best_scores
+#   python bulk.py export runs saison.jsonl
+#   python bulk.py import saison.jsonl            # runs ou players (archive produite par export)
+#
+# Format d'après l'extension (.csv ou .jsonl), table d'après les colonnes. Les runs
+# sont exportés avec le pseudo du joueur : à l'import, les joueurs sont retrouvés
+# (ou créés) par pseudo et les runs reçoivent de nouveaux id, l'archive peut donc
+# venir d'une autre base. Une archive de joueurs est fusionnée par pseudo (date
+# d'inscription la plus ancienne gardée). best_scores se déduit des runs et ne
+# s'importe pas.
+import argparse
+import base64
+import csv
+import json
+import sys
+import time
+from itertools import chain, islice
+from operator import itemgetter
+
+import db
+
+FETCH_SIZE = 10_000      # lignes lues par fetchmany à l'export
+IMPORT_BATCH = 100_000   # lignes par transaction à l'import
+
+EXPORT_QUERIES = {
+    "runs": """
+        SELECT runs.id, runs.player_id, players.username, runs.score, runs.duration_seconds,
+               runs.steps, runs.speed_mode, runs.wrap_walls, runs.grid_size, runs.created_at, runs.replay
+        FROM runs LEFT JOIN players ON players.id = runs.player_id
+        ORDER BY runs.id
+    """,
+    "players": "SELECT id, username, created_at FROM players ORDER BY id",
+    "best_scores": """
+        SELECT best_scores.player_id, players.username, best_scores.best_score, best_scores.updated_at
+        FROM best_scores LEFT JOIN players ON players.id = best_scores.player_id
+        ORDER BY best_scores.player_id
+    """,
+}
+
+
+def _is_csv(path):
+    return str(path).lower().endswith(".csv")
+
+
+# --- Export ---
+def iter_rows(table, fetch_size=FETCH_SIZE):
+    """(noms de colonnes, itérateur de tuples) d'une table, lue par paquets de `fetch_size`."""
+    if table not in EXPORT_QUERIES:
+        raise ValueError(f"Unknown table: {table}")
+    c = db.get_conn().cursor()
+    c.execute(EXPORT_QUERIES[table])
+    names = [d[0] for d in c.description]
+
+    def rows():
+        while True:
+            batch = c.fetchmany(fetch_size)
+            if not batch:
+                return
+            yield from batch
+    return names, rows()
+
+
+def export_table(table, path):
+    """Écrit `table` dans `path` (.csv ou .jsonl); renvoie le nombre de lignes."""
+    names, rows = iter_rows(table)
+    if "replay" in names:   # BLOB -> base64
+        i = names.index("replay")
+        rows = (row[:i] + (base64.b64encode(row[i]).decode("ascii"),) + row[i + 1:]
+                if row[i] is not None else row for row in rows)
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if _is_csv(path):
+            writer = csv.writer(f)
+            writer.writerow(names)
+            for row in rows:
+                writer.writerow(row)
+                n += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n")
+                n += 1
+    return n
+
+
+# --- Import ---
+# Les lignes passent brutes (textes du CSV, valeurs du JSONL) par une table
+# temporaire remplie par executemany; conversions, valeurs par défaut et
+# résolution des pseudos sont faites en SQL, un lot à la fois.
+IMPORT_COLUMNS = ("username", "score", "duration_seconds", "steps", "speed_mode",
+                  "wrap_walls", "grid_size", "created_at", "replay")
+PLAYER_COLUMNS = ("username", "created_at")
+
+
+def _b64decode(text):
+    return base64.b64decode(text) if text else None
+
+
+def _archive_table(names, path):
+    """Table d'une archive d'après ses colonnes : "runs" ou "players"."""
+    if "score" in names:
+        return "runs"
+    if "best_score" in names:
+        raise ValueError(f"best_scores is derived from runs, import the runs archive instead: {path}")
+    if "username" in names:
+        return "players"
+    raise ValueError(f"Missing score or username column in {path}")
+
+
+def _csv_tuples(reader, header, columns):
+    pos = {name: i for i, name in enumerate(header)}
+    if all(col in pos for col in columns):
+        yield from map(itemgetter(*(pos[col] for col in columns)), reader)
+    else:   # archive d'une version antérieure : colonnes absentes à NULL
+        idx = [pos.get(col) for col in columns]
+        for row in reader:
+            yield tuple(None if i is None else row[i] for i in idx)
+
+
+def _dict_tuples(rows, columns=IMPORT_COLUMNS):
+    for row in rows:
+        yield tuple(row.get(col) for col in columns)
+
+
+def _insert_batch(conn, now):
+    c = conn.cursor()
+    c.execute("""
+        INSERT OR IGNORE INTO players(username)
+        SELECT username FROM temp.import_stage
+        WHERE username <> '' AND username NOT IN (SELECT username FROM players)
+        GROUP BY username ORDER BY MIN(rowid)
+    """)
+    c.execute("""
+        INSERT INTO runs(player_id, score, duration_seconds, steps, speed_mode, wrap_walls,
+                         grid_size, created_at, replay)
+        SELECT players.id,
+               CAST(s.score AS INTEGER),
+               CAST(NULLIF(s.duration_seconds, '') AS INTEGER),
+               CAST(NULLIF(s.steps, '') AS INTEGER),
+               COALESCE(NULLIF(s.speed_mode, ''), 'normal'),
+               COALESCE(CAST(NULLIF(s.wrap_walls, '') AS INTEGER), 0),
+               COALESCE(CAST(NULLIF(s.grid_size, '') AS INTEGER), ?),
+               COALESCE(NULLIF(s.created_at, ''), ?),
+               CASE WHEN s.replay <> '' THEN b64decode(s.replay) END
+        FROM temp.import_stage AS s
+        LEFT JOIN players ON players.username = s.username AND s.username <> ''
+        ORDER BY s.rowid
+    """, (db.DEFAULT_GRID_SIZE, now))
+    c.execute("DELETE FROM temp.import_stage")
+
+
+def _import_tuples(tuples, batch_size):
+    conn = db.get_conn()
+    conn.create_function("b64decode", 1, _b64decode, deterministic=True)
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS import_stage({', '.join(IMPORT_COLUMNS)})")
+    marks = ", ".join("?" * len(IMPORT_COLUMNS))
+    with conn:
+        first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM runs").fetchone()[0]
+        conn.execute("PRAGMA user_version = 0")
+        db.drop_run_indexes(conn.cursor())
+    now = db.utc_now()
+    n = 0
+    try:
+        while True:
+            with conn:
+                c = conn.cursor()
+                c.executemany(f"INSERT INTO temp.import_stage VALUES ({marks})",
+                              islice(tuples, batch_size))
+                if not c.rowcount:
+                    break
+                n += c.rowcount
+                _insert_batch(conn, now)
+    finally:
+        with conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM temp.import_stage")
+            db.create_run_indexes(c)
+            db.merge_best_scores(c, first_id)
+        db.rebuild_rollups()
+        conn.execute(f"PRAGMA user_version = {db.SCHEMA_VERSION}")
+    return n
+
+
+def import_runs(rows, batch_size=IMPORT_BATCH):
+    """Ajoute des runs (dicts au format d'export) en masse; renvoie le nombre importé.
+
+    Les index de runs sont supprimés pendant le chargement et recréés à la fin;
+    best_scores et les rollups sont recalculés en une passe. Si l'import est
+    interrompu, user_version reste à 0 et init_db recrée les index au lancement.
+    """
+    return _import_tuples(_dict_tuples(rows), batch_size)
+
+
+def _import_player_tuples(tuples, batch_size):
+    conn = db.get_conn()
+    n = 0
+    while True:
+        batch = list(islice(tuples, batch_size))
+        if not batch:
+            return n
+        with conn:
+            c = conn.cursor()
+            c.executemany("""
+                INSERT INTO players(username, created_at)
+                SELECT ?1, COALESCE(NULLIF(?2, ''), CURRENT_TIMESTAMP) WHERE ?1 <> ''
+                ON CONFLICT(username) DO UPDATE SET
+                    created_at = MIN(created_at, excluded.created_at)
+            """, batch)
+            n += c.rowcount
+
+
+def import_players(rows, batch_size=IMPORT_BATCH):
+    """Fusionne des joueurs (dicts au format d'export) par pseudo; renvoie le nombre écrit.
+
+    Un pseudo inconnu est créé (nouvel id), un pseudo existant garde son id et
+    la plus ancienne des deux dates d'inscription.
+    """
+    return _import_player_tuples(_dict_tuples(rows, PLAYER_COLUMNS), batch_size)
+
+
+def import_file(path, batch_size=IMPORT_BATCH):
+    """Importe une archive d'export (runs ou players, d'après ses colonnes); renvoie le nombre de lignes."""
+    if _is_csv(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return 0
+            if _archive_table(header, path) == "players":
+                return _import_player_tuples(_csv_tuples(reader, header, PLAYER_COLUMNS), batch_size)
+            return _import_tuples(_csv_tuples(reader, header, IMPORT_COLUMNS), batch_size)
+    with open(path, encoding="utf-8") as f:
+        rows = map(json.loads, f)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        rows = chain((first,), rows)
+        if _archive_table(first, path) == "players":
+            return import_players(rows, batch_size)
+        return import_runs(rows, batch_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export/import en masse de snake.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("export", help="exporte une table en CSV ou JSONL")
+    p.add_argument("table", choices=sorted(EXPORT_QUERIES))
+    p.add_argument("path")
+    p = sub.add_parser("import", help="ajoute les runs ou les joueurs d'une archive CSV ou JSONL")
+    p.add_argument("path")
+    p.add_argument("--batch", type=int, default=IMPORT_BATCH, help="lignes par transaction")
+    args = parser.parse_args(argv)
+
+    db.init_db()
+    t0 = time.perf_counter()
+    if args.command == "export":
+        n = export_table(args.table, args.path)
+        print(f"{n} lignes exportées en {time.perf_counter() - t0:.1f} s")
+    else:
+        n = import_file(args.path, args.batch)
+        print(f"{n} lignes importées en {time.perf_counter() - t0:.1f} s")
+    db.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
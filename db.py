@@ -1,22 +1,119 @@
 # db.py
 import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from contextlib import closing
 
 DB_PATH = Path(__file__).with_name("snake.db")
 
+# --- Connexions ---
+# Une connexion longue durée par thread (ouvrir/fermer à chaque requête coûte plus
+# cher que la requête elle-même sur carte SD), réglée une fois à l'ouverture.
+# Les requêtes préparées sont réutilisées par le cache de sqlite3 (128 par
+# connexion par défaut, une partie en exécute une cinquantaine de distinctes) à
+# condition que leur texte ne change pas : valeurs toujours passées en paramètres.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",     # sûr en WAL, un fsync par checkpoint au lieu d'un par commit
+    "PRAGMA cache_size = -8000",       # ~8 Mo de cache de pages
+    "PRAGMA mmap_size = 67108864",     # 64 Mo lus via mmap
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+_local = threading.local()
+_conns = []
+_conns_lock = threading.Lock()
+_generation = 0   # incrémenté par close_all : les threads rouvrent leur connexion
+
+def _open_conn(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    """Connexion persistante du thread courant (rouverte si DB_PATH a changé)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH or _local.gen != _generation:
+        conn = _open_conn(DB_PATH)
+        _local.conn, _local.path, _local.gen = conn, DB_PATH, _generation
+        with _conns_lock:
+            _conns.append(conn)
+    return conn
+
+def release_thread_conn():
+    """Ferme la connexion du thread courant (threads de courte durée)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    with _conns_lock:
+        if conn in _conns:
+            _conns.remove(conn)
+    conn.close()
+    _local.conn = None
+
+
+def close_all():
+    """Ferme proprement toutes les connexions (à appeler en quittant le jeu)."""
+    global _generation
+    with _conns_lock:
+        conns = list(_conns)
+        _conns.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+# À incrémenter à chaque changement de schéma dans init_db (migrations rejouées une fois)
+SCHEMA_VERSION = 3
+
+# Grille des runs enregistrés avant la colonne grid_size (engine.DEFAULT_CELLS)
+DEFAULT_GRID_SIZE = 25
 
 def _column_exists(c, table: str, column: str) -> bool:
     c.execute(f"PRAGMA table_info({table})")
     return any(row[1] == column for row in c.fetchall())
 
+def _table_exists(c, table: str) -> bool:
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return c.fetchone() is not None
+
+# Index couvrants des classements : grille (toujours filtrée, un classement par
+# taille de plateau), filtres (niveau, bords) + plage created_at, avec
+# score/player_id inclus pour ne jamais relire la table.
+RUN_INDEXES = {
+    "idx_runs_grid_score": "runs(grid_size, score DESC)",
+    "idx_runs_player": "runs(player_id)",
+    "idx_runs_grid_mode_time": "runs(grid_size, speed_mode, wrap_walls, created_at, score, player_id)",
+    "idx_runs_grid_time": "runs(grid_size, created_at, wrap_walls, score, player_id)",
+}
+
+def create_run_indexes(c):
+    for name, target in RUN_INDEXES.items():
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+def drop_run_indexes(c):
+    """Avant un import massif : un seul tri par index à la recréation au lieu d'une mise à jour par ligne."""
+    for name in RUN_INDEXES:
+        c.execute(f"DROP INDEX IF EXISTS {name}")
+
 def init_db():
-    """Initialise/upgrade le schéma SANS effacer les données."""
-    with closing(get_conn()) as conn, conn:
+    """Initialise/upgrade le schéma SANS effacer les données.
+
+    Le numéro de version est gardé dans PRAGMA user_version : une base déjà à
+    jour ne coûte qu'une lecture de pragma au lancement.
+    """
+    with get_conn() as conn:
         c = conn.cursor()
-        c.execute("PRAGMA foreign_keys = ON")
+        if c.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            return
+        if _table_exists(c, "leaderboard_top") and not _column_exists(c, "leaderboard_top", "grid_key"):
+            c.execute("DROP TABLE leaderboard_top")   # rollups sans grille : régénérés plus bas
+        had_rollups = _table_exists(c, "leaderboard_top")
 
         # 1) Tables (si elles n'existent pas)
         c.executescript("""
@@ -48,6 +145,30 @@ def init_db():
           updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
           FOREIGN KEY (player_id) REFERENCES players(id) ON DELETE CASCADE
         );
+
+        -- Top-N maintenu à chaque run pour chaque (période, grille, niveau, bords) :
+        -- bucket = début local de la période ('' pour all), speed_key '*' et
+        -- wrap_key -1 = tous niveaux / tous bords. Jamais toutes grilles confondues.
+        CREATE TABLE IF NOT EXISTS leaderboard_top (
+          period TEXT NOT NULL,
+          bucket TEXT NOT NULL,
+          grid_key INTEGER NOT NULL,
+          speed_key TEXT NOT NULL,
+          wrap_key INTEGER NOT NULL,
+          run_id INTEGER NOT NULL,
+          score INTEGER NOT NULL,
+          player_id INTEGER,
+          created_at DATETIME NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_top_lookup
+          ON leaderboard_top(period, bucket, grid_key, speed_key, wrap_key, score DESC, created_at);
+
+        -- Fusion des bases de bornes (merge.py) : dernier id de run repris par source
+        CREATE TABLE IF NOT EXISTS merge_sources (
+          source TEXT PRIMARY KEY,
+          last_run_id INTEGER NOT NULL,
+          merged_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
         """)
 
         # 2) Upgrades de colonnes (ajout si manquantes)
@@ -55,24 +176,29 @@ def init_db():
             c.execute("ALTER TABLE runs ADD COLUMN speed_mode TEXT DEFAULT 'normal'")
         if not _column_exists(c, "runs", "wrap_walls"):
             c.execute("ALTER TABLE runs ADD COLUMN wrap_walls INTEGER DEFAULT 0")
+        if not _column_exists(c, "runs", "replay"):
+            c.execute("ALTER TABLE runs ADD COLUMN replay BLOB")   # voir replay.py
+        if not _column_exists(c, "runs", "grid_size"):
+            c.execute(f"ALTER TABLE runs ADD COLUMN grid_size INTEGER DEFAULT {DEFAULT_GRID_SIZE}")
 
         # 3) Index (après que les colonnes existent)
-        try:
-            c.execute("CREATE INDEX IF NOT EXISTS idx_runs_score ON runs(score DESC)")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("CREATE INDEX IF NOT EXISTS idx_runs_player ON runs(player_id)")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("CREATE INDEX IF NOT EXISTS idx_runs_speed ON runs(speed_mode)")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            c.execute("CREATE INDEX IF NOT EXISTS idx_runs_wrap ON runs(wrap_walls)")
-        except sqlite3.OperationalError:
-            pass
+        for sql in (
+            # remplacés par idx_runs_mode_time
+            "DROP INDEX IF EXISTS idx_runs_speed",
+            "DROP INDEX IF EXISTS idx_runs_wrap",
+            # remplacés par les index idx_runs_grid_* (grille en tête)
+            "DROP INDEX IF EXISTS idx_runs_score",
+            "DROP INDEX IF EXISTS idx_runs_mode_time",
+            "DROP INDEX IF EXISTS idx_runs_time",
+        ):
+            c.execute(sql)
+        create_run_indexes(c)
+
+        # 4) Rollups créés à l'instant sur une base existante : les remplir depuis runs
+        if not had_rollups:
+            _rebuild_rollups(c)
+
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 
 def get_or_create_player(username: str) -> int | None:
@@ -82,7 +208,7 @@ def get_or_create_player(username: str) -> int | None:
     if not (3 <= len(username) <= 20):
         raise ValueError("Username must be 3..20 chars: letters, digits, space, _ or -")
 
-    with closing(get_conn()) as conn, conn:
+    with get_conn() as conn:
         c = conn.cursor()
         c.execute("SELECT id FROM players WHERE username = ?", (username,))
         row = c.fetchone()
@@ -92,102 +218,425 @@ def get_or_create_player(username: str) -> int | None:
         return c.lastrowid
 
 
+def _insert_run(c, score, player_id=None, duration_seconds=None, steps=None,
+                speed_mode=None, wrap_walls=None, replay=None, grid_size=None):
+    speed_mode, wrap_walls = speed_mode or "normal", wrap_walls or 0
+    grid_size = grid_size or DEFAULT_GRID_SIZE
+    created_at = utc_now()
+    c.execute("""
+        INSERT INTO runs(player_id, score, duration_seconds, steps, speed_mode, wrap_walls,
+                         grid_size, created_at, replay)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (player_id, score, duration_seconds, steps, speed_mode, wrap_walls, grid_size, created_at, replay))
+    _update_rollups(c, c.lastrowid, score, player_id, created_at, grid_size, speed_mode, wrap_walls)
+
+    if player_id is not None:
+        c.execute("""
+            INSERT INTO best_scores(player_id, best_score)
+            VALUES (?, ?)
+            ON CONFLICT(player_id) DO UPDATE SET
+                best_score = MAX(best_score, excluded.best_score),
+                updated_at = CURRENT_TIMESTAMP
+        """, (player_id, score))
+
+
+def merge_best_scores(c, first_run_id):
+    """Met best_scores à jour en une passe pour les runs d'id >= first_run_id (imports, fusions).
+
+    `+player_id` : plage de rowid lue dans l'ordre plutôt que idx_runs_player
+    suivi d'un accès aléatoire par run (3x plus lent sur 10M de runs).
+    """
+    c.execute("""
+        INSERT INTO best_scores(player_id, best_score)
+        SELECT player_id, MAX(score) FROM runs
+        WHERE id >= ? AND player_id IS NOT NULL
+        GROUP BY +player_id
+        ON CONFLICT(player_id) DO UPDATE SET
+            best_score = MAX(best_score, excluded.best_score),
+            updated_at = CURRENT_TIMESTAMP
+    """, (first_run_id,))
+
+
 def record_run(score: int, player_id: int | None = None,
                duration_seconds: int | None = None, steps: int | None = None,
-               speed_mode: str | None = None, wrap_walls: int | None = None):
-    with closing(get_conn()) as conn, conn:
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO runs(player_id, score, duration_seconds, steps, speed_mode, wrap_walls)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (player_id, score, duration_seconds, steps, speed_mode or "normal", wrap_walls or 0))
-
-        if player_id is not None:
-            c.execute("""
-                INSERT INTO best_scores(player_id, best_score)
-                VALUES (?, ?)
-                ON CONFLICT(player_id) DO UPDATE SET
-                    best_score = MAX(best_score, excluded.best_score),
-                    updated_at = CURRENT_TIMESTAMP
-            """, (player_id, score))
-
-
-def top_scores(limit: int = 10):
-    with closing(get_conn()) as conn:
+               speed_mode: str | None = None, wrap_walls: int | None = None,
+               replay: bytes | None = None, grid_size: int | None = None):
+    with get_conn() as conn:
+        _insert_run(conn.cursor(), score, player_id, duration_seconds, steps, speed_mode, wrap_walls,
+                    replay, grid_size)
+    invalidate_leaderboards()
+
+
+def get_replay(run_id: int) -> bytes | None:
+    """Replay brut d'un run (à décoder avec replay.decode), None s'il n'en a pas."""
+    row = get_conn().execute("SELECT replay FROM runs WHERE id = ?", (run_id,)).fetchone()
+    return row[0] if row else None
+
+
+def record_runs(runs, settings: dict | None = None):
+    """Enregistre plusieurs runs (dicts d'arguments de record_run) en une transaction.
+
+    `settings` est écrit dans la même transaction (ex. point de reprise du journal).
+    """
+    with get_conn() as conn:
         c = conn.cursor()
-        c.execute("""
-            SELECT runs.score,
-                   COALESCE(players.username, 'Invité') AS username,
-                   runs.created_at
-            FROM runs
-            LEFT JOIN players ON players.id = runs.player_id
-            ORDER BY runs.score DESC, runs.created_at ASC
-            LIMIT ?
-        """, (limit,))
-        return c.fetchall()
+        for run in runs:
+            _insert_run(c, **run)
+        for key, value in (settings or {}).items():
+            _upsert_setting(c, key, value)
+    invalidate_leaderboards()
+
+
+def top_scores(limit: int = 10, grid_size: int = DEFAULT_GRID_SIZE):
+    if limit <= ROLLUP_SIZE:
+        return leaderboard("all", limit, grid_size=grid_size)
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("""
+        SELECT runs.score,
+               COALESCE(players.username, 'Invité') AS username,
+               runs.created_at
+        FROM runs
+        LEFT JOIN players ON players.id = runs.player_id
+        WHERE runs.grid_size = ?
+        ORDER BY runs.score DESC, runs.created_at ASC
+        LIMIT ?
+    """, (grid_size, limit))
+    return c.fetchall()
+
+
+def _utc_bound(day: date) -> str:
+    # minuit local de `day`, exprimé comme created_at (CURRENT_TIMESTAMP est en UTC)
+    local_midnight = datetime(day.year, day.month, day.day).astimezone()
+    return local_midnight.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+PERIODS = ("daily", "weekly", "monthly")
+
+
+def utc_now() -> str:
+    """Horodatage UTC au format de created_at (celui de CURRENT_TIMESTAMP)."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _local_day(created_at: str) -> date:
+    utc = datetime.strptime(created_at[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return utc.astimezone().date()
+
+
+def _period_start(period: str, day: date) -> date:
+    if period == "daily":
+        return day
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())   # semaine du lundi, année comprise
+    if period == "monthly":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def period_range(period: str, today: date | None = None):
+    """Bornes [début, fin) de created_at pour la période locale courante, None si pas de filtre."""
+    if period not in PERIODS:
+        return None
+    start = _period_start(period, today or date.today())
+    if period == "daily":
+        end = start + timedelta(days=1)
+    elif period == "weekly":
+        end = start + timedelta(days=7)
+    else:
+        end = (start + timedelta(days=32)).replace(day=1)
+    return _utc_bound(start), _utc_bound(end)
+
+
+# --- Rollups top-N ---
+ROLLUP_SIZE = 10   # lignes gardées par (période, bucket, grille, niveau, bords)
+
+# Mêmes buckets que _period_start, calculés en SQL depuis le jour local (`day`)
+_BUCKET_SQL = {
+    "daily":   "day",
+    "weekly":  "date(day, 'weekday 0', '-6 days')",
+    "monthly": "date(day, 'start of month')",
+    "all":     "''",
+}
+
+
+def _current_bucket(period: str) -> str:
+    return "" if period == "all" else _period_start(period, date.today()).isoformat()
+
+
+def _update_rollups(c, run_id, score, player_id, created_at, grid_size, speed_mode, wrap_walls):
+    day = _local_day(created_at)
+    for period in PERIODS + ("all",):
+        bucket = "" if period == "all" else _period_start(period, day).isoformat()
+        for speed_key in (speed_mode, "*"):
+            for wrap_key in (wrap_walls, -1):
+                key = (period, bucket, grid_size, speed_key, wrap_key)
+                c.execute("""
+                    INSERT INTO leaderboard_top(period, bucket, grid_key, speed_key, wrap_key,
+                                                run_id, score, player_id, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, key + (run_id, score, player_id, created_at))
+                c.execute("""
+                    DELETE FROM leaderboard_top WHERE rowid IN (
+                        SELECT rowid FROM leaderboard_top
+                        WHERE period = ? AND bucket = ? AND grid_key = ?
+                          AND speed_key = ? AND wrap_key = ?
+                        ORDER BY score DESC, created_at ASC, run_id ASC
+                        LIMIT -1 OFFSET ?)
+                """, key + (ROLLUP_SIZE,))
+
+
+def _rebuild_rollups(c):
+    # D'abord le top-N de chaque (jour local, grille, niveau, bords). Le top-N d'une
+    # semaine, d'un mois, de tout l'historique ou d'un regroupement (tous niveaux /
+    # tous bords) est inclus dans l'union des top-N journaliers qui le composent :
+    # il est calculé sur ce petit ensemble. Chaque top-N journalier est une plage
+    # de idx_runs_grid_mode_time (bornes UTC du jour local) avec ORDER BY ... LIMIT :
+    # pas de tri de toute la table (10x plus rapide sur 10M de runs).
+    c.execute("DROP TABLE IF EXISTS temp.rollup_days")
+    c.execute("""
+        CREATE TEMP TABLE rollup_days AS
+        WITH RECURSIVE
+          modes(grid_size, speed_mode, wrap_walls, first, last) AS (
+            SELECT grid_size, speed_mode, wrap_walls,
+                   date(MIN(created_at), 'localtime'), date(MAX(created_at), 'localtime')
+            FROM runs WHERE grid_size IS NOT NULL
+            GROUP BY grid_size, speed_mode, wrap_walls),
+          days(grid_size, speed_mode, wrap_walls, day, last) AS (
+            SELECT grid_size, speed_mode, wrap_walls, first, last FROM modes WHERE first IS NOT NULL
+            UNION ALL
+            SELECT grid_size, speed_mode, wrap_walls, date(day, '+1 day'), last FROM days WHERE day < last),
+          groups AS (
+            SELECT grid_size, speed_mode, wrap_walls, day,
+                   datetime(day, 'utc') AS lo, datetime(day, '+1 day', 'utc') AS hi
+            FROM days)
+        SELECT r.id, r.score, r.player_id, r.created_at, r.grid_size, r.speed_mode, r.wrap_walls, g.day
+        FROM groups AS g
+        JOIN runs AS r ON r.id IN (
+            SELECT t.id FROM runs AS t
+            WHERE t.grid_size = g.grid_size
+              AND t.speed_mode IS g.speed_mode AND t.wrap_walls IS g.wrap_walls
+              AND t.created_at >= g.lo AND t.created_at < g.hi
+            ORDER BY t.score DESC, t.created_at ASC, t.id ASC
+            LIMIT ?)
+    """, (ROLLUP_SIZE,))
+    c.execute("DELETE FROM leaderboard_top")
+    for period, bucket_sql in _BUCKET_SQL.items():
+        c.execute(f"""
+            INSERT INTO leaderboard_top(period, bucket, grid_key, speed_key, wrap_key,
+                                        run_id, score, player_id, created_at)
+            SELECT ?, bucket, grid_size, speed_key, wrap_key, id, score, player_id, created_at
+            FROM (
+                SELECT k.*, ROW_NUMBER() OVER (
+                           PARTITION BY bucket, grid_size, speed_key, wrap_key
+                           ORDER BY score DESC, created_at ASC, id ASC) AS rn
+                FROM (
+                    SELECT id, score, player_id, created_at, {bucket_sql} AS bucket, grid_size,
+                           speed_mode AS speed_key, wrap_walls AS wrap_key
+                    FROM rollup_days WHERE speed_mode IS NOT NULL AND wrap_walls IS NOT NULL
+                    UNION ALL
+                    SELECT id, score, player_id, created_at, {bucket_sql}, grid_size, '*', wrap_walls
+                    FROM rollup_days WHERE wrap_walls IS NOT NULL
+                    UNION ALL
+                    SELECT id, score, player_id, created_at, {bucket_sql}, grid_size, speed_mode, -1
+                    FROM rollup_days WHERE speed_mode IS NOT NULL
+                    UNION ALL
+                    SELECT id, score, player_id, created_at, {bucket_sql}, grid_size, '*', -1
+                    FROM rollup_days
+                ) AS k
+            )
+            WHERE rn <= ?
+        """, (period, ROLLUP_SIZE))
+    c.execute("DROP TABLE temp.rollup_days")
+
+
+def rebuild_rollups():
+    """Régénère les rollups depuis runs (après import, fusion ou changement de schéma)."""
+    with get_conn() as conn:
+        _rebuild_rollups(conn.cursor())
+    invalidate_leaderboards()
+
+
+def _rollup_query(period, limit, speed_mode, wrap_walls, grid_size):
+    period = period if period in PERIODS else "all"
+    key = (period, _current_bucket(period), grid_size,
+           "*" if speed_mode is None else speed_mode,
+           -1 if wrap_walls is None else (1 if wrap_walls else 0))
+    return """
+        SELECT t.score,
+               COALESCE(players.username, 'Invité') AS username,
+               t.created_at
+        FROM leaderboard_top AS t
+        LEFT JOIN players ON players.id = t.player_id
+        WHERE t.period = ? AND t.bucket = ? AND t.grid_key = ?
+          AND t.speed_key = ? AND t.wrap_key = ?
+        ORDER BY t.score DESC, t.created_at ASC
+        LIMIT ?
+    """, list(key + (limit,))
+
+
+def _leaderboard_query(period, limit, speed_mode, wrap_walls, grid_size):
+    # Prédicats directement sur les colonnes (jamais DATE()/strftime() dessus) pour
+    # que idx_runs_grid_mode_time / idx_runs_grid_time servent la plage et couvrent la requête.
+    filters, params = ["grid_size = ?"], [grid_size]
+    if speed_mode is not None:
+        filters.append("speed_mode = ?")
+        params.append(speed_mode)
+        if wrap_walls is None:
+            # record_run n'écrit que 0/1 : l'égalité multiple garde la plage created_at indexable
+            filters.append("wrap_walls IN (0, 1)")
+    if wrap_walls is not None:
+        filters.append("wrap_walls = ?")
+        params.append(1 if wrap_walls else 0)
+    bounds = period_range(period)
+    if bounds is not None:
+        filters.append("created_at >= ? AND created_at < ?")
+        params.extend(bounds)
+
+    where_clause = " AND ".join(filters)
+    query = f"""
+        SELECT r.score,
+               COALESCE(players.username, 'Invité') AS username,
+               r.created_at
+        FROM (SELECT score, player_id, created_at
+              FROM runs
+              WHERE {where_clause}
+              ORDER BY score DESC, created_at ASC
+              LIMIT ?) AS r
+        LEFT JOIN players ON players.id = r.player_id
+        ORDER BY r.score DESC, r.created_at ASC
+    """
+    params.append(limit)
+    return query, params
+
+
+def _leaderboard_sql(period, limit, speed_mode, wrap_walls, grid_size):
+    # Jusqu'à ROLLUP_SIZE lignes : simple lecture des rollups, sans tri
+    if limit <= ROLLUP_SIZE:
+        return _rollup_query(period, limit, speed_mode, wrap_walls, grid_size)
+    return _leaderboard_query(period, limit, speed_mode, wrap_walls, grid_size)
 
 
 def leaderboard(period: str = "daily", limit: int = 10,
-                speed_mode: str | None = None, wrap_walls: bool | None = None):
-    with closing(get_conn()) as conn:
-        c = conn.cursor()
+                speed_mode: str | None = None, wrap_walls: bool | None = None,
+                grid_size: int = DEFAULT_GRID_SIZE):
+    query, params = _leaderboard_sql(period, limit, speed_mode, wrap_walls, grid_size)
+    c = get_conn().cursor()
+    c.execute(query, params)
+    return c.fetchall()
+
+
+def explain_leaderboard(period: str = "daily", limit: int = 10,
+                        speed_mode: str | None = None, wrap_walls: bool | None = None,
+                        grid_size: int = DEFAULT_GRID_SIZE):
+    """Plan (EXPLAIN QUERY PLAN) de leaderboard(), pour vérifier l'usage des index."""
+    query, params = _leaderboard_sql(period, limit, speed_mode, wrap_walls, grid_size)
+    c = get_conn().cursor()
+    c.execute("EXPLAIN QUERY PLAN " + query, params)
+    return [row[-1] for row in c.fetchall()]
+
+
+# --- Cache des classements ---
+# Les 3x4x3 combinaisons de filtres (par grille) reviennent sans cesse : on garde le résultat
+# en mémoire avec le numéro de génération au moment de la lecture (incrémenté
+# après chaque écriture de run) et le bucket de période (jour/semaine/mois
+# changé = entrée périmée).
+_lb_cache = {}
+_lb_generation = 0
+_lb_lock = threading.Lock()
+
 
-        if period == "daily":
-            date_cond = "DATE(runs.created_at) = DATE('now','localtime')"
-        elif period == "weekly":
-            date_cond = "strftime('%W', runs.created_at) = strftime('%W', 'now','localtime')"
-        elif period == "monthly":
-            date_cond = "strftime('%Y-%m', runs.created_at) = strftime('%Y-%m', 'now','localtime')"
-        else:
-            date_cond = "1=1"
-
-        filters = [date_cond]
-        params = []
-        if speed_mode is not None:
-            filters.append("runs.speed_mode = ?")
-            params.append(speed_mode)
-        if wrap_walls is not None:
-            filters.append("runs.wrap_walls = ?")
-            params.append(1 if wrap_walls else 0)
-
-        where_clause = " AND ".join(filters)
-        query = f"""
-            SELECT runs.score,
-                   COALESCE(players.username, 'Invité') AS username,
-                   runs.created_at
-            FROM runs
-            LEFT JOIN players ON players.id = runs.player_id
-            WHERE {where_clause}
-            ORDER BY runs.score DESC, runs.created_at ASC
-            LIMIT ?
-        """
-        params.append(limit)
-        c.execute(query, params)
-        return c.fetchall()
+def invalidate_leaderboards():
+    global _lb_generation
+    with _lb_lock:
+        _lb_generation += 1
+
+
+def cached_leaderboard(period: str = "daily", limit: int = 10,
+                       speed_mode: str | None = None, wrap_walls: bool | None = None,
+                       grid_size: int = DEFAULT_GRID_SIZE):
+    key = (period, limit, speed_mode, wrap_walls, grid_size)
+    bucket = _current_bucket(period if period in PERIODS else "all")
+    with _lb_lock:
+        generation = _lb_generation
+        entry = _lb_cache.get(key)
+    if entry is not None and entry[0] == generation and entry[1] == bucket:
+        return entry[2]
+    rows = leaderboard(period, limit, speed_mode, wrap_walls, grid_size)
+    with _lb_lock:
+        _lb_cache[key] = (generation, bucket, rows)
+    return rows
+
+
+def prefetch_leaderboards(speed_modes, limit: int = 10, grid_size: int = DEFAULT_GRID_SIZE):
+    """Remplit le cache pour toutes les combinaisons dans un thread d'arrière-plan."""
+    def work():
+        try:
+            for period in PERIODS:
+                for speed_mode in (None,) + tuple(speed_modes):
+                    for wrap_walls in (None, True, False):
+                        cached_leaderboard(period, limit, speed_mode, wrap_walls, grid_size)
+        except sqlite3.Error as e:
+            print("DB error:", e)
+        finally:
+            release_thread_conn()
+    t = threading.Thread(target=work, name="leaderboard-prefetch", daemon=True)
+    t.start()
+    return t
 
 
 def player_best(player_id: int) -> int | None:
-    with closing(get_conn()) as conn:
-        c = conn.cursor()
-        c.execute("SELECT best_score FROM best_scores WHERE player_id = ?", (player_id,))
-        row = c.fetchone()
-        return row[0] if row else None
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT best_score FROM best_scores WHERE player_id = ?", (player_id,))
+    row = c.fetchone()
+    return row[0] if row else None
+
+
+def _upsert_setting(c, key, value):
+    c.execute("""
+        INSERT INTO settings(key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            value = excluded.value,
+            updated_at = CURRENT_TIMESTAMP
+    """, (key, value))
 
 
 def set_setting(key: str, value: str):
-    with closing(get_conn()) as conn, conn:
+    with get_conn() as conn:
+        _upsert_setting(conn.cursor(), key, value)
+
+
+def set_settings(values: dict):
+    """Écrit plusieurs réglages en une seule transaction."""
+    with get_conn() as conn:
         c = conn.cursor()
-        c.execute("""
-            INSERT INTO settings(key, value) VALUES (?, ?)
-            ON CONFLICT(key) DO UPDATE SET
-                value = excluded.value,
-                updated_at = CURRENT_TIMESTAMP
-        """, (key, value))
+        for key, value in values.items():
+            _upsert_setting(c, key, value)
+
+
+def all_settings() -> dict:
+    c = get_conn().cursor()
+    c.execute("SELECT key, value FROM settings")
+    return dict(c.fetchall())
 
 
 def get_setting(key: str, default: str | None = None) -> str | None:
-    with closing(get_conn()) as conn:
-        c = conn.cursor()
-        c.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        row = c.fetchone()
-        return row[0] if row else default
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute("SELECT value FROM settings WHERE key = ?", (key,))
+    row = c.fetchone()
+    return row[0] if row else default
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Maintenance de snake.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild-rollups", help="régénère les top-N (leaderboard_top) depuis runs")
+    args = parser.parse_args()
+    init_db()
+    if args.command == "rebuild-rollups":
+        rebuild_rollups()
+        print("Rollups regénérés.")
+    close_all()
@@ -0,0 +1,205 @@
+# engine.py
+# Logique pure du jeu (aucune dépendance pygame) : utilisable en headless
+# pour les tests, les simulations en masse, la vérification de scores et les bots.
+import random
+from array import array
+from collections import deque
+
+# --- Directions (dx, dy) ---
+UP    = (0, -1)
+DOWN  = (0, 1)
+LEFT  = (-1, 0)
+RIGHT = (1, 0)
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# --- Résultats de Game.step ---
+MOVED = "MOVED"
+ATE   = "ATE"
+DEAD  = "DEAD"
+WON   = "WON"    # plus aucune case libre pour la pomme : plateau rempli
+
+DEFAULT_CELLS = 25
+SPEED_INTERVALS = {"facile": 220, "normal": 180, "difficile": 140}   # ms par tick selon le niveau
+TURN_QUEUE_SIZE = 3   # virages tapés d'avance, consommés un par tick
+
+
+def opposite(direction):
+    return (-direction[0], -direction[1])
+
+
+class FreeCells:
+    """Index des cases libres : ajout, retrait et tirage uniforme en O(1).
+
+    `cells` est un tableau compact des cases libres (retrait par échange avec
+    la dernière), `pos[cell]` sa position dans ce tableau ou -1 si occupée.
+    """
+    def __init__(self, size):
+        self.cells = array("i", range(size))
+        self.pos = array("i", range(size))
+    def __len__(self):
+        return len(self.cells)
+    def __contains__(self, cell):
+        return self.pos[cell] >= 0
+    def add(self, cell):
+        if self.pos[cell] < 0:
+            self.pos[cell] = len(self.cells)
+            self.cells.append(cell)
+    def remove(self, cell):
+        i = self.pos[cell]
+        if i < 0:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.pos[last] = i
+        self.pos[cell] = -1
+    def pick(self, rng):
+        """Case libre tirée uniformément, ou -1 si le plateau est plein."""
+        if not self.cells:
+            return -1
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class Food:
+    def __init__(self, cells, rng, free):
+        self.cells = cells
+        self.rng = rng
+        self.position = self.generate_random_position(free)
+    def generate_random_position(self, free):
+        return free.pick(self.rng)
+
+
+class Snake:
+    """Corps = deque d'indices de cases (y * cells + x), tête en premier.
+
+    `occupied` est un bitmap (1 octet par case) et `free` l'index des cases
+    libres, tous deux maintenus à chaque mouvement : avancer, grandir, tester
+    une collision et placer la pomme se font en temps constant.
+    """
+    def __init__(self, cells):
+        self.cells = cells
+        self.occupied = bytearray(cells * cells)
+        self.free = FreeCells(cells * cells)
+        self.body = deque()
+        self.reset()
+    def start_body(self):
+        # (6, 9) sur la grille 25x25 d'origine, ramené dans la grille si elle est plus petite
+        x = min(6, self.cells - 2)
+        y = min(9, self.cells // 2)
+        return [y * self.cells + x - i for i in range(3)]
+    @property
+    def head(self):
+        return self.body[0]
+    def next_cell(self, wrap_walls):
+        """Case visée par la tête, ou -1 si elle sort de la grille sans wrap."""
+        n = self.cells
+        y, x = divmod(self.body[0], n)
+        dx, dy = self.direction
+        x += dx
+        y += dy
+        if wrap_walls:
+            x %= n
+            y %= n
+        elif not (0 <= x < n and 0 <= y < n):
+            return -1
+        return y * n + x
+    def move(self, cell):
+        """Avance la tête sur `cell`; renvoie True si elle mord le corps."""
+        if self.new_block:
+            self.new_block = False
+        else:
+            tail = self.body.pop()               # la queue libère sa case avant le test
+            self.occupied[tail] = 0
+            self.free.add(tail)
+        self.heading = self.direction
+        hit = self.occupied[cell]
+        self.body.appendleft(cell)
+        self.occupied[cell] = 1
+        self.free.remove(cell)
+        return bool(hit)
+    def reset(self):
+        for cell in self.body:
+            self.occupied[cell] = 0
+        # index des cases libres reconstruit dans l'ordre initial : avec la même
+        # graine, une partie après reset place ses pommes comme une partie neuve
+        self.free = FreeCells(self.cells * self.cells)
+        self.body = deque(self.start_body())
+        for cell in self.body:
+            self.occupied[cell] = 1
+            self.free.remove(cell)
+        self.direction = RIGHT
+        self.heading = RIGHT   # dernière direction réellement jouée
+        self.new_block = False
+
+
+class Game:
+    def __init__(self, cells=DEFAULT_CELLS, wrap_walls=False, rng=None):
+        if cells < 4:
+            raise ValueError("Grid must be at least 4 cells wide")
+        self.cells = cells
+        self.wrap_walls = wrap_walls
+        self.rng = rng if rng is not None else random.Random()
+        self.snake = Snake(cells)
+        self.food = Food(cells, self.rng, self.snake.free)
+        self.turns = deque()
+        self.score = 0
+        self.ticks = 0
+        self.over = False
+        self.on_turn = None   # callback(tick, direction) à chaque virage joué (replays)
+
+    def queue_turn(self, direction):
+        """Met un virage en file pour les prochains ticks (un par tick).
+
+        Un virage identique ou opposé au dernier demandé est ignoré, ce qui
+        empêche deux touches rapides de faire faire demi-tour au serpent.
+        """
+        last = self.turns[-1] if self.turns else self.snake.direction
+        if direction == last or direction == opposite(last) or len(self.turns) >= TURN_QUEUE_SIZE:
+            return False
+        self.turns.append(direction)
+        return True
+
+    def turn(self, direction):
+        """Change la direction; un demi-tour sur la dernière direction jouée est ignoré."""
+        if direction == opposite(self.snake.heading):
+            return False
+        self.snake.direction = direction
+        return True
+
+    def step(self, direction=None):
+        """Avance d'un tick et renvoie MOVED, ATE, DEAD ou WON."""
+        if self.over:
+            return WON if self.food.position < 0 else DEAD
+        if direction is None and self.turns:
+            direction = self.turns.popleft()
+        if (direction is not None and direction != self.snake.direction
+                and self.turn(direction) and self.on_turn is not None):
+            self.on_turn(self.ticks, direction)
+        self.ticks += 1
+        cell = self.snake.next_cell(self.wrap_walls)
+        if cell < 0 or self.snake.move(cell):
+            return self._die()
+        if cell == self.food.position:
+            self.food.position = self.food.generate_random_position(self.snake.free)
+            self.snake.new_block = True
+            self.score += 1
+            if self.food.position < 0:
+                self.over = True
+                return WON
+            return ATE
+        return MOVED
+
+    def _die(self):
+        self.over = True
+        return DEAD
+
+    def reset(self, seed=None):
+        """Nouvelle partie; avec `seed`, rejouable à l'identique par Game(rng=Random(seed))."""
+        if seed is not None:
+            self.rng.seed(seed)
+        self.snake.reset()
+        self.food.position = self.food.generate_random_position(self.snake.free)
+        self.turns.clear()
+        self.score = 0
+        self.ticks = 0
+        self.over = False
@@ -0,0 +1,122 @@
+# merge.py
+# Fusion des bases des bornes dans une base commune (classement de la salle).
+#
+#   python merge.py borne1/snake.db borne2/snake.db            # dans snake.db
+#   python merge.py /mnt/bornes/*.db --into salle.db
+#
+# Chaque source est attachée (ATTACH) et fusionnée en quelques requêtes
+# ensemblistes : joueurs dédoublonnés par pseudo, player_id réécrits, runs
+# ajoutés à la suite. Le dernier id de run repris est gardé par source dans
+# merge_sources : relancer la fusion (ex. chaque nuit) ne reprend que les
+# nouveaux runs. best_scores et les rollups sont recalculés une fois à la fin.
+import argparse
+import sqlite3
+import sys
+from pathlib import Path
+
+import db
+
+RUN_COLUMNS = ("score", "duration_seconds", "steps", "speed_mode", "wrap_walls", "grid_size",
+               "created_at", "replay")
+# colonne absente d'une source ancienne : valeur reprise à la place de NULL
+MISSING_DEFAULTS = {"grid_size": str(db.DEFAULT_GRID_SIZE)}
+
+
+def _source_columns(c):
+    c.execute("PRAGMA src.table_info(runs)")
+    return {row[1] for row in c.fetchall()}
+
+
+def _merge_source(conn, source):
+    """Fusionne la base attachée `src`; renvoie (runs ajoutés, joueurs ajoutés)."""
+    c = conn.cursor()
+    row = c.execute("SELECT last_run_id FROM merge_sources WHERE source = ?", (source,)).fetchone()
+    last_id = row[0] if row else 0
+    new_last = c.execute("SELECT COALESCE(MAX(id), 0) FROM src.runs").fetchone()[0]
+    if new_last <= last_id:
+        return 0, 0
+
+    # sources d'anciennes versions : colonnes absentes remplacées par NULL (ou leur défaut)
+    have = _source_columns(c)
+    select = ", ".join(f"r.{col}" if col in have else MISSING_DEFAULTS.get(col, "NULL")
+                       for col in RUN_COLUMNS)
+
+    c.execute("""
+        INSERT OR IGNORE INTO players(username, created_at)
+        SELECT sp.username, sp.created_at FROM src.players AS sp
+        WHERE sp.id IN (SELECT DISTINCT player_id FROM src.runs WHERE id > ?)
+        ORDER BY sp.id
+    """, (last_id,))
+    players = c.rowcount
+    c.execute(f"""
+        INSERT INTO runs(player_id, {", ".join(RUN_COLUMNS)})
+        SELECT p.id, {select}
+        FROM src.runs AS r
+        LEFT JOIN src.players AS sp ON sp.id = r.player_id
+        LEFT JOIN main.players AS p ON p.username = sp.username
+        WHERE r.id > ? AND r.id <= ?
+        ORDER BY r.id
+    """, (last_id, new_last))
+    runs = c.rowcount
+    c.execute("""
+        INSERT INTO merge_sources(source, last_run_id) VALUES (?, ?)
+        ON CONFLICT(source) DO UPDATE SET
+            last_run_id = excluded.last_run_id,
+            merged_at = CURRENT_TIMESTAMP
+    """, (source, new_last))
+    return runs, players
+
+
+def merge(sources, target=None):
+    """Fusionne les bases `sources` dans `target` (défaut : db.DB_PATH).
+
+    Renvoie {source: (runs ajoutés, joueurs ajoutés)}. Une source est identifiée
+    par son chemin absolu : la déplacer revient à la fusionner depuis le début.
+    """
+    if target is not None:
+        db.DB_PATH = Path(target)
+    db.init_db()
+    conn = db.get_conn()
+    target_path = Path(db.DB_PATH).resolve()
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM runs").fetchone()[0]
+    paths = [Path(source).resolve() for source in sources]
+    for path in paths:   # vérifiées avant de toucher à la cible
+        if path == target_path:
+            raise ValueError(f"Cannot merge a database into itself: {path}")
+        if not path.exists():
+            raise ValueError(f"No such database: {path}")
+    report = {}
+    for path in paths:
+        # ATTACH hors transaction; lecture seule pour ne jamais modifier la borne
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{path}?mode=ro",))
+        try:
+            with conn:
+                report[str(path)] = _merge_source(conn, str(path))
+        finally:
+            conn.execute("DETACH DATABASE src")
+    if any(runs for runs, _ in report.values()):
+        with conn:
+            db.merge_best_scores(conn.cursor(), first_id)
+        db.rebuild_rollups()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fusionne des bases de bornes Snake")
+    parser.add_argument("sources", nargs="+", help="bases snake.db des bornes")
+    parser.add_argument("--into", help="base cible (défaut : snake.db)")
+    args = parser.parse_args(argv)
+    try:
+        report = merge(args.sources, args.into)
+    except (ValueError, sqlite3.Error) as e:
+        print("Merge error:", e)
+        return 1
+    finally:
+        db.close_all()
+    for source, (runs, players) in report.items():
+        print(f"{source} : {runs} runs, {players} nouveaux joueurs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# profiler.py
+# Instrumentation optionnelle de la boucle : durée de chaque phase d'une frame
+# (perf_counter_ns), histogrammes glissants (p50/p95/p99), ticks perdus,
+# overlay à l'écran et export périodique en JSONL ou CSV.
+#
+# Activation : SNAKE_PROFILE=1 au lancement, ou touche F3 en jeu.
+# Export : SNAKE_PROFILE_OUT=chemin (.jsonl ou .csv), toutes les EXPORT_INTERVAL_S.
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+PHASES = ("events", "update", "background", "draw", "display")
+WINDOW = 600              # frames gardées pour les percentiles (~10 s à 60 fps)
+EXPORT_INTERVAL_S = 10.0
+OVERLAY_REFRESH_S = 0.5
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, export_path=None):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.samples = {name: deque(maxlen=WINDOW) for name in PHASES + ("frame", "interval")}
+        self.dropped_ticks = 0
+        self.frames = 0
+        self.first_frame_ms = None   # temps de démarrage, renseigné par Snake.show_first_frame
+        self._current = {}
+        self._t_frame = self._t_lap = 0
+        self._t_last_end = None
+        self._next_export = time.monotonic() + EXPORT_INTERVAL_S
+        self._overlay = None
+        self._overlay_at = 0.0
+        self._overlay_size = (0, 0)
+        self._font = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(enabled=os.environ.get("SNAKE_PROFILE", "") not in ("", "0"),
+                   export_path=os.environ.get("SNAKE_PROFILE_OUT") or None)
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._t_last_end = None
+
+    # --- Mesure ---
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._current = {}
+        self._t_frame = self._t_lap = time.perf_counter_ns()
+
+    def lap(self, phase):
+        """Attribue le temps écoulé depuis le lap précédent à `phase`."""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self._current[phase] = self._current.get(phase, 0) + (now - self._t_lap)
+        self._t_lap = now
+
+    def add_dropped_ticks(self, n):
+        if self.enabled:
+            self.dropped_ticks += n
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        for phase in PHASES:
+            self.samples[phase].append(self._current.get(phase, 0) / 1e6)
+        self.samples["frame"].append((now - self._t_frame) / 1e6)
+        if self._t_last_end is not None:
+            self.samples["interval"].append((now - self._t_last_end) / 1e6)
+        self._t_last_end = now
+        self.frames += 1
+        if self.export_path and time.monotonic() >= self._next_export:
+            self._next_export = time.monotonic() + EXPORT_INTERVAL_S
+            self.export()
+
+    # --- Statistiques ---
+    def summary(self):
+        out = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "frames": self.frames,
+               "dropped_ticks": self.dropped_ticks, "first_frame_ms": self.first_frame_ms}
+        for name, values in self.samples.items():
+            s = sorted(values)
+            out[name] = {"p50": round(percentile(s, 50), 3),
+                         "p95": round(percentile(s, 95), 3),
+                         "p99": round(percentile(s, 99), 3)}
+        intervals = self.samples["interval"]
+        out["fps"] = round(1000 * len(intervals) / sum(intervals), 1) if intervals else 0.0
+        return out
+
+    def export(self):
+        summary = self.summary()
+        try:
+            if self.export_path.endswith(".csv"):
+                row = {"time": summary["time"], "frames": summary["frames"],
+                       "dropped_ticks": summary["dropped_ticks"], "fps": summary["fps"],
+                       "first_frame_ms": summary["first_frame_ms"]}
+                for name in PHASES + ("frame", "interval"):
+                    for p in ("p50", "p95", "p99"):
+                        row[f"{name}_{p}"] = summary[name][p]
+                new_file = not os.path.exists(self.export_path)
+                with open(self.export_path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerow(row)
+            else:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(summary) + "\n")
+        except OSError as e:
+            print("Profiler export error:", e)
+
+    # --- Overlay ---
+    def _render_overlay(self):
+        if self._font is None:
+            self._font = pygame.font.Font(None, 22)
+        s = self.summary()
+        lines = [f"{s['fps']:.0f} fps   frame p50 {s['frame']['p50']:.2f}  "
+                 f"p95 {s['frame']['p95']:.2f}  p99 {s['frame']['p99']:.2f} ms",
+                 f"ticks perdus : {s['dropped_ticks']}"]
+        if s["first_frame_ms"] is not None:
+            lines.append(f"premier affichage : {s['first_frame_ms']:.0f} ms")
+        lines += [f"{name:<10} p50 {s[name]['p50']:.2f}  p95 {s[name]['p95']:.2f} ms" for name in PHASES]
+        rendered = [self._font.render(line, True, (230, 240, 210)) for line in lines]
+        # taille qui ne fait que croître et fond opaque : redessiné par-dessus
+        # lui-même en mode zones sales sans laisser de traces
+        w = max(self._overlay_size[0], max(r.get_width() for r in rendered) + 16)
+        h = max(self._overlay_size[1], sum(r.get_height() for r in rendered) + 12)
+        self._overlay_size = (w, h)
+        surf = pygame.Surface((w, h))
+        surf.fill((20, 28, 12))
+        y = 6
+        for r in rendered:
+            surf.blit(r, (8, y))
+            y += r.get_height()
+        return surf
+
+    def draw(self, surface, pos=(8, 8)):
+        """Dessine l'overlay (rafraîchi toutes les OVERLAY_REFRESH_S); renvoie son rect."""
+        now = time.monotonic()
+        if self._overlay is None or now - self._overlay_at >= OVERLAY_REFRESH_S:
+            self._overlay = self._render_overlay()
+            self._overlay_at = now
+        return surface.blit(self._overlay, pos)
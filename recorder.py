@@ -0,0 +1,133 @@
+# recorder.py
+# Enregistrement des parties en arrière-plan (write-behind) : la fin de partie ne
+# fait plus d'INSERT ni de fsync sur le thread de rendu. Les runs passent par une
+# file bornée vidée par un thread qui les écrit par lots, en une transaction.
+#
+# Chaque run est d'abord ajouté à un journal JSONL (un run par ligne, numéroté).
+# Le dernier numéro commité est stocké dans `settings` dans la même transaction
+# que le lot : au démarrage, les lignes du journal au-delà de ce numéro (crash
+# avant écriture) sont rejouées, celles déjà commitées sont ignorées. Un lot en
+# échec est réessayé avant les suivants, jamais sauté.
+import base64
+import json
+import queue
+import threading
+from pathlib import Path
+
+import db
+
+QUEUE_SIZE = 256
+BATCH_SIZE = 64
+RETRY_SECONDS = 2.0   # attente avant de réessayer un lot en échec sans nouveau run
+SEQ_SETTING = "recorder_seq"
+_STOP = object()
+
+
+def default_journal_path():
+    return Path(db.DB_PATH).with_name("pending_runs.jsonl")
+
+
+def _to_journal(run):
+    # le replay (bytes) passe en base64 dans le JSON
+    if run["replay"] is None:
+        return run
+    return dict(run, replay=base64.b64encode(run["replay"]).decode("ascii"))
+
+
+def _from_journal(run):
+    if run.get("replay"):
+        run["replay"] = base64.b64decode(run["replay"])
+    return run
+
+
+class RunRecorder:
+    def __init__(self, journal_path=None, maxsize=QUEUE_SIZE):
+        self.journal_path = Path(journal_path or default_journal_path())
+        self.queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()   # protège le journal, `seq` et `pending`
+        self.pending = 0                # runs journalisés mais pas encore commités
+        self.seq = int(db.get_setting(SEQ_SETTING, "0"))
+        self._replay_journal()
+        self.thread = threading.Thread(target=self._worker, name="run-recorder", daemon=True)
+        self.thread.start()
+
+    def record(self, score, player_id=None, duration_seconds=None, steps=None,
+               speed_mode=None, wrap_walls=None, replay=None, grid_size=None):
+        """Met un run en file (même signature que db.record_run); ne touche pas à la base."""
+        run = {"score": score, "player_id": player_id,
+               "duration_seconds": duration_seconds, "steps": steps,
+               "speed_mode": speed_mode, "wrap_walls": wrap_walls, "replay": replay,
+               "grid_size": grid_size}
+        with self._lock:
+            self.seq += 1
+            seq = self.seq
+            # flush sans fsync : survit à un crash du processus, pas à une coupure de courant
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"seq": seq, "run": _to_journal(run)}) + "\n")
+            self.pending += 1
+        self.queue.put((seq, run))
+
+    def flush(self):
+        """Attend que tous les runs en file soient écrits (lecture de ses propres écritures)."""
+        self.queue.join()
+
+    def close(self):
+        """Vide la file puis arrête le thread (à appeler en quittant)."""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def _replay_journal(self):
+        if not self.journal_path.exists():
+            return
+        runs, last = [], self.seq
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue   # dernière ligne tronquée par le crash
+                if item["seq"] > self.seq:
+                    runs.append(_from_journal(item["run"]))
+                    last = max(last, item["seq"])
+        if runs:
+            db.record_runs(runs, settings={SEQ_SETTING: str(last)})
+        self.seq = last
+        self.journal_path.unlink()
+
+    def _worker(self):
+        # Un lot en échec est gardé et repassé en tête du lot suivant : le numéro
+        # commité ne dépasse ainsi jamais un run qui n'est pas encore en base.
+        failed = []
+        stop = False
+        while not stop or failed:
+            try:
+                batch = [self.queue.get(timeout=RETRY_SECONDS if failed else None)]
+            except queue.Empty:
+                batch = []   # rien de neuf : nouvel essai du lot en échec
+            while len(failed) + len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(item is _STOP for item in batch):
+                stop = True
+            items = failed + [item for item in batch if item is not _STOP]
+            try:
+                if items:
+                    db.record_runs([run for _, run in items],
+                                   settings={SEQ_SETTING: str(items[-1][0])})
+                    failed = []
+                    with self._lock:
+                        self.pending -= len(items)
+                        if self.pending == 0:
+                            self.journal_path.unlink(missing_ok=True)
+            except Exception as e:
+                print("DB error:", e)
+                failed = items
+                if stop:
+                    # le journal est conservé : les runs seront rejoués au prochain démarrage
+                    return
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
@@ -0,0 +1,113 @@
+# replay.py
+# Replays binaires compacts : de quoi rejouer une partie à l'identique avec
+# engine.Game (graine du RNG, taille de grille, bords, niveau) + les virages.
+#
+# Format (version 1), entiers en varint LEB128 sauf l'en-tête fixe :
+#   "SR" | version u8 | flags u8 (bit 0 = wrap) | niveau u8 | graine u64 LE
+#   cells | ticks | score | nombre de virages
+#   virages : varint((tick - tick précédent) << 2 | index dans DIRECTIONS)
+# `tick` = nombre de ticks joués avant celui où le virage s'applique. Une partie
+# typique tient en quelques centaines d'octets (un ou deux octets par virage).
+import struct
+
+from engine import DIRECTIONS
+
+MAGIC = b"SR"
+VERSION = 1
+SPEED_MODES = ("facile", "normal", "difficile")
+_HEADER = struct.Struct("<2sBBBQ")
+_DIR_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+
+
+def _put_varint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _get_varint(data, i):
+    n = shift = 0
+    while True:
+        if i >= len(data):
+            raise ValueError("Truncated replay")
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+class ReplayWriter:
+    """Encodeur en flux : brancher `on_turn` sur Game.on_turn.
+
+    Rien n'est fait aux ticks sans virage; un virage ajoute un ou deux octets
+    au tampon, réutilisé d'une partie à l'autre.
+    """
+    def __init__(self):
+        self.events = bytearray()
+        self.start(0, 0, False, None)
+
+    def start(self, seed, cells, wrap_walls, speed_mode):
+        self.seed = seed
+        self.cells = cells
+        self.wrap_walls = wrap_walls
+        self.speed_mode = speed_mode
+        self.count = 0
+        self.last_tick = 0
+        del self.events[:]
+
+    def on_turn(self, tick, direction):
+        _put_varint(self.events, (tick - self.last_tick) << 2 | _DIR_INDEX[direction])
+        self.last_tick = tick
+        self.count += 1
+
+    def finish(self, ticks, score):
+        """Replay complet (bytes) de la partie en cours."""
+        speed = SPEED_MODES.index(self.speed_mode) if self.speed_mode in SPEED_MODES else 255
+        out = bytearray(_HEADER.pack(MAGIC, VERSION, 1 if self.wrap_walls else 0, speed, self.seed))
+        for n in (self.cells, ticks, score, self.count):
+            _put_varint(out, n)
+        out += self.events
+        return bytes(out)
+
+
+class Replay:
+    def __init__(self, seed, cells, wrap_walls, speed_mode, ticks, score, turns):
+        self.seed = seed
+        self.cells = cells
+        self.wrap_walls = wrap_walls
+        self.speed_mode = speed_mode
+        self.ticks = ticks
+        self.score = score
+        self.turns = turns   # [(tick, direction)], ticks croissants
+
+    def __repr__(self):
+        return (f"Replay(seed={self.seed}, cells={self.cells}, wrap_walls={self.wrap_walls}, "
+                f"speed_mode={self.speed_mode!r}, ticks={self.ticks}, score={self.score}, "
+                f"turns={len(self.turns)})")
+
+
+def decode(data):
+    """Décode un replay produit par ReplayWriter.finish; ValueError s'il est invalide."""
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated replay")
+    magic, version, flags, speed, seed = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a replay")
+    if version != VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    i = _HEADER.size
+    cells, i = _get_varint(data, i)
+    ticks, i = _get_varint(data, i)
+    score, i = _get_varint(data, i)
+    count, i = _get_varint(data, i)
+    turns, tick = [], 0
+    for _ in range(count):
+        n, i = _get_varint(data, i)
+        tick += n >> 2
+        turns.append((tick, DIRECTIONS[n & 3]))
+    return Replay(seed, cells, bool(flags & 1),
+                  SPEED_MODES[speed] if speed < len(SPEED_MODES) else None,
+                  ticks, score, turns)
@@ -0,0 +1,72 @@
+# settings.py
+# Réglages en mémoire : tous chargés en une requête au démarrage, lus sans toucher
+# à la base, et écrits en différé (les clics rapprochés sont regroupés en un seul
+# commit, déclenché par un timer ou à la sortie).
+import threading
+
+import db
+
+FLUSH_DELAY_S = 1.0
+
+
+class SettingsStore:
+    def __init__(self, flush_delay=FLUSH_DELAY_S):
+        self.flush_delay = flush_delay
+        self.values = db.all_settings()
+        self.dirty = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    # --- Lecture (typée) ---
+    def get(self, key: str, default: str | None = None) -> str | None:
+        return self.values.get(key, default)
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.values.get(key)
+        return default if value is None else value == "1"
+
+    def get_choice(self, key: str, choices, default: str) -> str:
+        value = self.values.get(key, default)
+        return value if value in choices else default
+
+    # --- Écriture (différée) ---
+    def set(self, key: str, value: str):
+        value = str(value)
+        with self._lock:
+            if self.values.get(key) == value and key not in self.dirty:
+                return
+            self.values[key] = value
+            self.dirty[key] = value
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def set_bool(self, key: str, value: bool):
+        self.set(key, "1" if value else "0")
+
+    def flush(self):
+        with self._lock:
+            pending, self.dirty = self.dirty, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if pending:
+            try:
+                db.set_settings(pending)
+            except Exception as e:
+                print("DB error:", e)
+                with self._lock:
+                    # réessayé au prochain flush, sans écraser une valeur plus récente
+                    for key, value in pending.items():
+                        self.dirty.setdefault(key, value)
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+        db.release_thread_conn()
+
+    def close(self):
+        """Écrit ce qui reste en attente (à appeler en quittant)."""
+        self.flush()
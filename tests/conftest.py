@@ -0,0 +1,5 @@
+# Les modules du jeu sont à la racine du dépôt, sans paquet : on la rend importable.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
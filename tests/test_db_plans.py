@@ -0,0 +1,28 @@
+# Régression des plans de requête des classements : au-delà de ROLLUP_SIZE
+# lignes, leaderboard() interroge runs par plage created_at, qui doit rester
+# servie par un index idx_runs_grid_* (jamais un parcours complet de runs).
+import pytest
+
+import db
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "plans.db")
+    db.init_db()
+    yield
+    db.close_all()
+
+
+@pytest.mark.parametrize("period", db.PERIODS + ("all",))
+@pytest.mark.parametrize("speed_mode", [None, "normal"])
+@pytest.mark.parametrize("wrap_walls", [None, False, True])
+def test_range_query_uses_grid_index(fresh_db, period, speed_mode, wrap_walls):
+    plan = db.explain_leaderboard(period, db.ROLLUP_SIZE + 1, speed_mode, wrap_walls)
+    assert not any(step.startswith("SCAN runs") for step in plan), plan
+    assert any("idx_runs_grid_" in step for step in plan), plan
+
+
+def test_default_limit_reads_rollups(fresh_db):
+    plan = db.explain_leaderboard("daily")
+    assert any("idx_top_lookup" in step for step in plan), plan
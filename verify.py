@@ -0,0 +1,225 @@
+# verify.py
+# Vérification des scores : chaque run est rejoué en headless avec les règles
+# du jeu (engine.Game) et la graine de son replay; un run dont le score rejoué
+# diffère du score enregistré est signalé.
+#
+#   python verify.py                    # audit de toute la table runs
+#   python verify.py --run 42 --run 43  # quelques runs
+#   python verify.py --db autre.db -j 8 --strict
+#
+# Avant de rejouer, l'en-tête du replay (grille, bords, niveau, ticks) est comparé au run
+# et le nombre de ticks plafonné d'après la durée enregistrée : un replay forgé ne
+# peut pas bloquer l'audit, un replay trop long est signalé invérifiable.
+#
+# En bibliothèque : verify_replay(blob, score) pour un run, audit() pour la table.
+# L'audit découpe la table en plages d'id traitées par un pool de processus,
+# chacun lisant la base en lecture seule.
+import argparse
+import multiprocessing
+import random
+import sqlite3
+import sys
+import time
+
+import db
+import engine
+import replay
+
+CHUNK_SIZE = 5000   # runs par tâche du pool
+MAX_CELLS = 1024    # au-delà, replay refusé plutôt que d'allouer la grille
+# Plafond de ticks avant simulation (un replay forgé pourrait annoncer 2**62 ticks
+# en wrap et ne jamais mourir) : le plus grand de MIN_TICKS (des heures de jeu sans
+# manger), de TICKS_PER_FOOD x cells² ticks par pomme et des ticks que la durée
+# enregistrée permet au niveau du replay (runs.duration_seconds = ticks x intervalle),
+# jamais plus de MAX_TICKS.
+TICKS_PER_FOOD = 4
+MIN_TICKS = 100_000        # ~4 h au niveau le plus rapide
+MAX_TICKS = 5_000_000
+
+# Raisons de signalement
+SCORE = "score"            # score rejoué différent du score enregistré
+UNFINISHED = "unfinished"  # le serpent est encore en vie après le dernier tick
+EARLY_END = "early_end"    # partie finie avant le nombre de ticks annoncé
+MODE = "mode"              # grille, bords ou niveau du replay différents de ceux du run
+STEPS = "steps"            # ticks du replay différents de runs.steps
+INVALID = "invalid"        # replay illisible
+UNVERIFIABLE = "unverifiable"  # plus de ticks que le plafond : non rejoué
+NO_REPLAY = "no_replay"    # run sans replay (signalé seulement en mode strict)
+
+
+def simulate(rp):
+    """Rejoue un replay décodé; renvoie le Game dans son état final."""
+    game = engine.Game(rp.cells, rp.wrap_walls, rng=random.Random(rp.seed))
+    step = game.step
+    turns = rp.turns
+    i, n = 0, len(turns)
+    next_tick = turns[0][0] if turns else -1
+    for t in range(rp.ticks):
+        if t == next_tick:
+            step(turns[i][1])
+            i += 1
+            next_tick = turns[i][0] if i < n else -1
+        else:
+            step()
+        if game.over:
+            break
+    return game
+
+
+def max_ticks(cells, score, duration_seconds=None, speed_mode=None):
+    """Nombre de ticks au-delà duquel un replay n'est pas rejoué."""
+    area = cells * cells
+    cap = max(MIN_TICKS, (min(score, area) + 1) * TICKS_PER_FOOD * area)
+    if duration_seconds is not None:
+        # niveau inconnu : intervalle le plus court, donc le plafond le plus large
+        interval = engine.SPEED_INTERVALS.get(speed_mode, min(engine.SPEED_INTERVALS.values()))
+        cap = max(cap, (duration_seconds + 1) * 1000 // interval)
+    return min(MAX_TICKS, cap)
+
+
+def verify_replay(blob, score=None, wrap_walls=None, steps=None, speed_mode=None, grid_size=None,
+                  duration_seconds=None):
+    """Rejoue `blob` et le compare au run; renvoie (raison ou None, score rejoué, ticks).
+
+    L'en-tête (grille, bords, niveau, ticks) est comparé au run avant de rejouer quoi que ce soit.
+    """
+    try:
+        rp = replay.decode(blob)
+        if rp.cells > MAX_CELLS:
+            raise ValueError("Grid too large")
+    except ValueError:
+        return INVALID, None, 0
+    if score is None:
+        score = rp.score
+    if rp.ticks > max_ticks(rp.cells, score, duration_seconds, rp.speed_mode or speed_mode):
+        return UNVERIFIABLE, None, 0
+    if grid_size is not None and grid_size != rp.cells:
+        return MODE, None, 0
+    if wrap_walls is not None and bool(wrap_walls) != rp.wrap_walls:
+        return MODE, None, 0
+    if speed_mode is not None and rp.speed_mode is not None and speed_mode != rp.speed_mode:
+        return MODE, None, 0
+    if steps is not None and steps != rp.ticks:
+        return STEPS, None, 0
+    game = simulate(rp)
+    if game.score != score:
+        return SCORE, game.score, game.ticks
+    if game.ticks < rp.ticks:
+        return EARLY_END, game.score, game.ticks
+    if not game.over:
+        return UNFINISHED, game.score, game.ticks
+    return None, game.score, game.ticks
+
+
+# --- Audit de la table ---
+RUN_FIELDS = "id, score, wrap_walls, steps, speed_mode, grid_size, duration_seconds, replay"
+
+
+def _run_fields(conn):
+    # base d'avant la colonne grid_size (jamais ouverte par le jeu) : grille non vérifiée
+    if any(row[1] == "grid_size" for row in conn.execute("PRAGMA table_info(runs)")):
+        return RUN_FIELDS
+    return RUN_FIELDS.replace("grid_size", "NULL AS grid_size")
+_worker_conn = None
+
+
+def _ro_conn(path):
+    global _worker_conn
+    if _worker_conn is None:
+        _worker_conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    return _worker_conn
+
+
+def _verify_rows(rows, strict):
+    checked = no_replay = ticks = 0
+    flagged = []
+    for run_id, score, wrap_walls, steps, speed_mode, grid_size, duration, blob in rows:
+        checked += 1
+        if blob is None:
+            no_replay += 1
+            if strict:
+                flagged.append((run_id, NO_REPLAY, score, None))
+            continue
+        reason, replayed, n = verify_replay(blob, score, wrap_walls, steps, speed_mode, grid_size,
+                                            duration)
+        ticks += n
+        if reason:
+            flagged.append((run_id, reason, score, replayed))
+    return checked, no_replay, ticks, flagged
+
+
+def _audit_range(task):
+    path, lo, hi, strict, fields = task
+    rows = _ro_conn(path).execute(
+        f"SELECT {fields} FROM runs WHERE id >= ? AND id < ?", (lo, hi)).fetchall()
+    return _verify_rows(rows, strict)
+
+
+def audit(db_path=None, processes=None, run_ids=None, strict=False, chunk_size=CHUNK_SIZE):
+    """Vérifie les runs (tous, ou `run_ids`) et renvoie un résumé.
+
+    `processes` : taille du pool (défaut : nombre de CPU, 1 = sans pool).
+    Le résumé contient `flagged`, liste de (run_id, raison, score enregistré, score rejoué).
+    """
+    path = str(db_path or db.DB_PATH)
+    t0 = time.perf_counter()
+    totals = [0, 0, 0]
+    flagged = []
+
+    def add(result):
+        for k in range(3):
+            totals[k] += result[k]
+        flagged.extend(result[3])
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        fields = _run_fields(conn)
+        if run_ids:
+            marks = ",".join("?" * len(run_ids))
+            add(_verify_rows(conn.execute(
+                f"SELECT {fields} FROM runs WHERE id IN ({marks})",
+                list(run_ids)).fetchall(), strict))
+            lo = hi = 0
+        else:
+            lo, hi = conn.execute("SELECT MIN(id), MAX(id) FROM runs").fetchone()
+    finally:
+        conn.close()
+
+    if not run_ids and lo is not None:
+        tasks = [(path, start, start + chunk_size, strict, fields) for start in range(lo, hi + 1, chunk_size)]
+        processes = processes or multiprocessing.cpu_count()
+        if processes <= 1 or len(tasks) == 1:
+            for task in tasks:
+                add(_audit_range(task))
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                for result in pool.imap_unordered(_audit_range, tasks):
+                    add(result)
+
+    seconds = time.perf_counter() - t0
+    flagged.sort()
+    return {"checked": totals[0], "no_replay": totals[1], "ticks": totals[2],
+            "seconds": round(seconds, 3),
+            "ticks_per_second": round(totals[2] / seconds) if seconds else 0,
+            "flagged": flagged}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérifie les scores de snake.db en rejouant les replays")
+    parser.add_argument("--db", help="base à auditer (défaut : snake.db)")
+    parser.add_argument("--run", type=int, action="append", help="id de run à vérifier (répétable)")
+    parser.add_argument("-j", "--processes", type=int, help="processus du pool (défaut : nombre de CPU)")
+    parser.add_argument("--strict", action="store_true", help="signaler aussi les runs sans replay")
+    args = parser.parse_args(argv)
+
+    report = audit(args.db, args.processes, args.run, args.strict)
+    for run_id, reason, score, replayed in report["flagged"]:
+        print(f"run {run_id} : {reason} (enregistré {score}, rejoué {replayed})")
+    print(f"{report['checked']} runs vérifiés ({report['no_replay']} sans replay), "
+          f"{len(report['flagged'])} signalés, {report['ticks']} ticks en {report['seconds']} s "
+          f"({report['ticks_per_second']} ticks/s)")
+    return 1 if report["flagged"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())